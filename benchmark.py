@@ -0,0 +1,311 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from transport.client import Client
+from transport.journal import Journal
+from transport.persistence import load_company, save_company
+from transport.store import VEHICLE_KINDS
+from transport.transportcompany import TransportCompany
+from transport.vectorized import np
+from transport.vehicle import Truck, Train
+
+SYLLABLES = ("ан", "бо", "ва", "ге", "ди", "ка", "ло", "ми", "но", "ра", "се", "та", "юр", "ян")
+
+# Распределения веса груза клиента (т)
+WEIGHTS = {
+    "uniform": lambda rng: rng.uniform(0.5, 20.0),
+    "lognormal": lambda rng: min(rng.lognormvariate(1.5, 0.8), 10000.0),
+    "pareto": lambda rng: min(rng.paretovariate(1.5), 10000.0),
+}
+
+STATE_FORMATS = (".json", ".ndjson", ".tcs", ".tcsnap", ".sqlite")
+
+# Замеры короче этого не сравниваются с базой: их разброс больше порога
+MIN_SECONDS = 0.005
+MIN_PEAK_BYTES = 256 * 1024
+
+
+def generate_clients(n: int, seed: int, vip_share: float = 0.1, weights: str = "uniform"):
+    # Колонки для ClientStore.extend_columns
+    rng = random.Random(seed)
+    weight = WEIGHTS[weights]
+    names = []
+    for _ in range(n):
+        name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.append(name.capitalize())
+    return {
+        "names": names,
+        "weights": [weight(rng) for _ in range(n)],
+        "vip": [rng.random() < vip_share for _ in range(n)],
+    }
+
+
+def generate_fleet(n: int, total_weight: float, seed: int,
+                   train_share: float = 0.3, fill: float = 0.95):
+    # Колонки для VehicleStore.extend_columns; суммарная вместимость —
+    # доля fill от общего веса грузов, чтобы часть клиентов оставалась без места
+    rng = random.Random(seed)
+    kinds, capacities, colors, cars = [], [], [], []
+    for _ in range(n):
+        if rng.random() < train_share:
+            number = rng.randint(5, 40)
+            kinds.append(VEHICLE_KINDS.index(Train))
+            capacities.append(number * rng.uniform(40.0, 70.0))
+            colors.append(None)
+            cars.append(number)
+        else:
+            kinds.append(VEHICLE_KINDS.index(Truck))
+            capacities.append(rng.uniform(5.0, 40.0))
+            colors.append(rng.choice(("белый", "синий", "красный")))
+            cars.append(0)
+    scale = fill * total_weight / sum(capacities)
+    return {
+        "kinds": kinds,
+        "capacities": [c * scale for c in capacities],
+        "id_hi": [rng.getrandbits(64) for _ in range(n)],
+        "id_lo": [rng.getrandbits(64) for _ in range(n)],
+        "colors": colors,
+        "cars": cars,
+    }
+
+
+def make_company(data, incremental: bool = False):
+    company = TransportCompany("Benchmark", incremental=incremental)
+    company.clients.extend_columns(data["clients"])
+    company.vehicles.extend_columns(data["vehicles"])
+    return company
+
+
+def _distribute(**kwargs):
+    def run(company):
+        company.optimize_cargo_distribution(**kwargs)
+    return run
+
+
+def operations(data, workdir):
+    # name -> (setup() -> state, run(state)); setup в замер не входит
+    ops = {
+        "distribute": (lambda: make_company(data), _distribute()),
+        "first_fit": (lambda: make_company(data), _distribute(strategy="first_fit")),
+        "best_fit": (lambda: make_company(data), _distribute(strategy="best_fit")),
+        "find_clients": (lambda: make_company(data),
+                         lambda company: company.find_clients("рами")),
+        "sort_clients": (lambda: make_company(data),
+                         lambda company: company.client_sort.rows("cargo_weight")),
+    }
+    if np is not None:
+        ops["distribute_numpy"] = (lambda: make_company(data), _distribute(engine="numpy"))
+
+    for ext in STATE_FORMATS:
+        path = os.path.join(workdir, "state" + ext)
+        ops["save" + ext.replace(".", "_")] = (
+            lambda: make_company(data),
+            lambda company, path=path: save_company(company, path),
+        )
+
+        def load_setup(path=path):
+            if not os.path.exists(path):
+                save_company(make_company(data), path)
+            return TransportCompany("Benchmark")
+        ops["load" + ext.replace(".", "_")] = (
+            load_setup, lambda company, path=path: load_company(company, path),
+        )
+
+    journals = []
+
+    def journal_setup():
+        # Файл уже сохранён, после него 100 правок; замеряется Ctrl+S —
+        # сброс журнала, без закрытия
+        while journals:
+            journals.pop().close()
+        company = make_company(data)
+        journal = Journal(company, os.path.join(workdir, "journal.tcs"), batch_size=1000)
+        journal.attach()
+        journal.compact(background=False)
+        for i in range(100):
+            company.clients[i % len(company.clients)] = Client("Правка", 1.0 + i, False)
+        journals.append(journal)
+        return journal
+    ops["journal_save_100"] = (journal_setup, lambda journal: journal.flush())
+    return ops
+
+
+def gui_operations(data):
+    # Пути обновления таблиц главного окна; нужен дисплей (можно Xvfb)
+    import main_gui
+
+    app = main_gui.MainApp()
+    app.withdraw()
+
+    def setup():
+        app.company = make_company(data, incremental=True)
+        app.filter_var.set("")
+        app.client_sort_state = None
+        app.update()
+        return app
+
+    def set_filter(app):
+        app.filter_var.set("рами")
+        app.refresh_clients()
+
+    ops = {
+        "gui_refresh_clients": (setup, lambda app: app.refresh_clients()),
+        "gui_refresh_vehicles": (setup, lambda app: app.refresh_vehicles()),
+        "gui_filter_clients": (setup, set_filter),
+        "gui_sort_clients": (setup, lambda app: app._sort_clients("weight")),
+    }
+    return app, ops
+
+
+def measure(setup, run, repeat: int, memory: bool):
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del state
+
+    peak = None
+    if memory:
+        # Отдельный прогон: трассировка памяти заметно замедляет код
+        state = setup()
+        gc.collect()
+        tracemalloc.start()
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def start_xvfb(display: str):
+    # Запускает Xvfb, если дисплея нет; возвращает процесс или None
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None
+    proc = subprocess.Popen([xvfb, display, "-screen", "0", "1280x1024x24"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    os.environ["DISPLAY"] = display
+    return proc
+
+
+def compare(results, baseline, threshold: float):
+    # Список строк с регрессиями относительно базы
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current["seconds"] >= MIN_SECONDS and base["seconds"] >= MIN_SECONDS:
+            ratio = current["seconds"] / base["seconds"]
+            if ratio > 1 + threshold:
+                regressions.append(f"{key}: время {base['seconds']:.4f} -> {current['seconds']:.4f} с "
+                                   f"(+{(ratio - 1) * 100:.0f}%)")
+        if current["peak_bytes"] and base.get("peak_bytes") and base["peak_bytes"] >= MIN_PEAK_BYTES:
+            ratio = current["peak_bytes"] / base["peak_bytes"]
+            if ratio > 1 + threshold:
+                regressions.append(f"{key}: память {base['peak_bytes'] / 2**20:.1f} -> "
+                                   f"{current['peak_bytes'] / 2**20:.1f} МБ (+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_benchmarks(args, log=sys.stdout):
+    results = {}
+    xvfb = start_xvfb(args.display) if args.gui else None
+    try:
+        for size in args.sizes:
+            clients = generate_clients(size, args.seed, args.vip_share, args.weights)
+            vehicles = generate_fleet(max(1, size // args.clients_per_vehicle),
+                                      sum(clients["weights"]), args.seed + 1, args.train_share)
+            data = {"clients": clients, "vehicles": vehicles}
+
+            with tempfile.TemporaryDirectory() as workdir:
+                ops = operations(data, workdir)
+                app = None
+                if args.gui:
+                    try:
+                        app, gui_ops = gui_operations(data)
+                        ops.update(gui_ops)
+                    except Exception as e:
+                        print(f" GUI пропущен: {e}", file=log)
+                        args.gui = False
+
+                for name, (setup, run) in ops.items():
+                    if args.only and name not in args.only:
+                        continue
+                    key = f"{name}/{size}"
+                    results[key] = measure(setup, run, args.repeat, not args.no_memory)
+                    peak = results[key]["peak_bytes"]
+                    peak_text = f"{peak / 2**20:9.1f} МБ" if peak is not None else ""
+                    print(f"{name:22} {size:>9} {results[key]['seconds']:10.4f} с {peak_text}",
+                          file=log, flush=True)
+
+                if app is not None:
+                    app.destroy()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры распределения, сохранения и GUI")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5, 10**6],
+                        help="число клиентов в наборах")
+    parser.add_argument("--seed", type=int, default=12)
+    parser.add_argument("--weights", choices=sorted(WEIGHTS), default="uniform")
+    parser.add_argument("--vip-share", type=float, default=0.1)
+    parser.add_argument("--train-share", type=float, default=0.3)
+    parser.add_argument("--clients-per-vehicle", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="лучший из N прогонов")
+    parser.add_argument("--only", nargs="+", help="только указанные операции")
+    parser.add_argument("--no-memory", action="store_true", help="не измерять пиковую память")
+    parser.add_argument("--gui", action="store_true",
+                        help="замерить обновление таблиц GUI (без дисплея запускается Xvfb)")
+    parser.add_argument("--display", default=":99", help="дисплей для Xvfb")
+    parser.add_argument("--save-baseline", help="записать результаты в JSON")
+    parser.add_argument("--baseline", help="сравнить с результатами из JSON")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="допустимый рост времени и памяти (доля)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "seed": args.seed,
+                "weights": args.weights,
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f" Регрессия {line}")
+        if regressions:
+            sys.exit(1)
+        print(" Регрессий нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import argparse
+
+from transport.batch import run_batch
+from transport.service import DEFAULT_PORT, serve
+from transport.strategies import STRATEGIES
 from transport.client import Client
 from transport.vehicle import Truck, Train
 from transport.transportcompany import TransportCompany
@@ -57,7 +62,11 @@ def menu():
 
         elif choice == "5":
             print("\n=== Распределение грузов ===")
-            company.optimize_cargo_distribution()
+            result = company.optimize_cargo_distribution()
+            if result.message:
+                print(f" {result.message}")
+            for name, remaining in result.shortfalls():
+                print(f" Клиент {name}: не удалось распределить {remaining} т.")
 
             for v in company.vehicles:
                 print("\n", v)
@@ -74,5 +83,38 @@ def menu():
             print("Неверный пункт меню.")
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Транспортная компания")
+    parser.add_argument("--batch", action="store_true",
+                        help="пакетный режим без меню")
+    parser.add_argument("--clients", help="клиенты: CSV, JSONL или JSON-массив")
+    parser.add_argument("--vehicles", help="транспорт: CSV, JSONL или JSON-массив")
+    parser.add_argument("--output", help="результат: CSV, NDJSON или JSON-массив (.json)")
+    parser.add_argument("--strategy", default="split", choices=["split", *STRATEGIES],
+                        help="распределение с делением груза или упаковка без деления")
+    parser.add_argument("--engine", default="python", choices=["python", "numpy"],
+                        help="движок распределения с делением груза")
+    parser.add_argument("--stats", action="store_true",
+                        help="вывести время по фазам и счётчики распределения")
+    parser.add_argument("--serve", action="store_true",
+                        help="сервис приёма регистраций и распределения (JSON-строки по TCP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(TransportCompany("Service", stats=args.stats), args.host, args.port)
+        return
+
+    if not args.batch:
+        menu()
+        return
+
+    if not (args.clients and args.vehicles and args.output):
+        parser.error("для --batch нужны --clients, --vehicles и --output")
+    run_batch(args.clients, args.vehicles, args.output,
+              strategy=args.strategy, engine=args.engine, stats=args.stats)
+
+
 if __name__ == "__main__":
-    menu()
+    main()
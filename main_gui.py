@@ -1,12 +1,51 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
 import re
 import os
+import queue
+import threading
 
+from transport.allocation import AllocationPart
 from transport.client import Client
 from transport.vehicle import Truck, Train, Vehicle
-from transport.transportcompany import TransportCompany
+from transport.transportcompany import TransportCompany, DistributionCancelled
+from transport.database import CompanyDatabase
+from transport.journal import Journal
+from transport.export import export_distribution
+
+STATE_FILETYPES = [
+    ("JSON files", "*.json"),
+    ("NDJSON (потоковый)", "*.ndjson *.jsonl"),
+    ("Двоичный формат", "*.tcs"),
+    ("Снимок (mmap)", "*.tcsnap"),
+    ("База SQLite", "*.sqlite *.sqlite3 *.db"),
+]
+
+DATABASE_FILETYPES = [("База SQLite", "*.sqlite *.sqlite3 *.db")]
+
+EXPORT_FILETYPES = [
+    ("NDJSON", "*.ndjson"),
+    ("NDJSON, gzip", "*.ndjson.gz"),
+    ("CSV", "*.csv"),
+    ("CSV, gzip", "*.csv.gz"),
+    ("JSON files", "*.json"),
+]
+
+# Колонки таблиц -> ключи сортировки модели
+CLIENT_SORT_KEYS = {"name": "name", "weight": "cargo_weight", "vip": "is_vip"}
+VEHICLE_SORT_KEYS = {
+    "id": "vehicle_id", "type": "type", "capacity": "capacity",
+    "load": "current_load", "clients": "clients_count",
+}
+
+# Задержка фильтра клиентов после последнего нажатия клавиши
+FILTER_DELAY_MS = 200
+
+# Период опроса фонового распределения
+POLL_MS = 100
+
+# Период сброса журнала изменений на диск
+JOURNAL_FLUSH_MS = 1000
 
 NAME_RE = re.compile(r"^[A-Za-zА-Яа-яЁё\s\-]{2,}$")
 
@@ -26,6 +65,161 @@ def show_error(msg: str):
 def show_info(msg: str):
     messagebox.showinfo("Информация", msg)
 
+class VirtualTable(ttk.Frame):
+    # Таблица, которая держит в Treeview только видимое окно строк модели.
+    # rows — последовательность номеров строк модели (range или список),
+    # values(row) — значения колонок строки. Элементы Treeview переиспользуются
+    # при прокрутке, поэтому стоимость отрисовки зависит от высоты окна,
+    # а не от размера данных.
+    def __init__(self, parent, columns, headers, values, on_heading=None, on_select=None):
+        super().__init__(parent)
+        self.values = values
+        self.on_select = on_select
+        self.rows = range(0)
+        self.top = 0
+        self.visible = 20
+        self.selected_pos = None
+        # Пока модель меняется в фоне, таблица не перечитывает строки
+        self.frozen = False
+
+        self.headers = dict(zip(columns, headers))
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="browse")
+        for col, title in zip(columns, headers):
+            command = (lambda c=col: on_heading(c)) if on_heading else ""
+            self.tree.heading(col, text=title, command=command)
+            self.tree.column(col, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.visible))
+        self.tree.bind("<Home>", lambda e: self.move_selection(-len(self.rows)))
+        self.tree.bind("<End>", lambda e: self.move_selection(len(self.rows)))
+
+    def set_sort_indicator(self, column, descending: bool):
+        for col, title in self.headers.items():
+            if col == column:
+                title += " ▼" if descending else " ▲"
+            self.tree.heading(col, text=title)
+
+    def bind_rows(self, sequence, func):
+        self.tree.bind(sequence, func)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.selected_pos = None
+        self._clamp_top()
+        self.render()
+
+    def selected(self):
+        # Номер строки модели под выделением или None
+        if self.selected_pos is None or self.selected_pos >= len(self.rows):
+            return None
+        return self.rows[self.selected_pos]
+
+    def clear_selection(self):
+        self.selected_pos = None
+        self.render()
+
+    def _clamp_top(self):
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+
+    def render(self):
+        if self.frozen:
+            return
+        tree = self.tree
+        count = max(0, min(self.visible, len(self.rows) - self.top))
+        items = tree.get_children("")
+        if len(items) > count:
+            tree.delete(*items[count:])
+
+        for i in range(count):
+            row = self.rows[self.top + i]
+            iid = str(i)
+            if i < len(items):
+                tree.item(iid, values=self.values(row), tags=(str(row),))
+            else:
+                tree.insert("", "end", iid=iid, values=self.values(row), tags=(str(row),))
+
+        pos = self.selected_pos
+        if pos is not None and self.top <= pos < self.top + count:
+            iid = str(pos - self.top)
+            if tree.selection() != (iid,):
+                tree.selection_set(iid)
+            tree.focus(iid)
+        elif tree.selection():
+            tree.selection_remove(*tree.selection())
+
+        n = len(self.rows)
+        if n:
+            self.scrollbar.set(self.top / n, (self.top + count) / n)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.top += step * self.visible if args[2] == "pages" else step
+        self._clamp_top()
+        self.render()
+
+    def move_selection(self, delta):
+        n = len(self.rows)
+        if not n:
+            return "break"
+        pos = self.top if self.selected_pos is None else self.selected_pos + delta
+        pos = max(0, min(pos, n - 1))
+        changed = pos != self.selected_pos
+        self.selected_pos = pos
+        if self.selected_pos < self.top:
+            self.top = self.selected_pos
+        elif self.selected_pos >= self.top + self.visible:
+            self.top = self.selected_pos - self.visible + 1
+        self._clamp_top()
+        self.render()
+        if changed:
+            self._selection_changed()
+        return "break"
+
+    def _on_select(self, _):
+        # Снятие выделения при прокрутке не сбрасывает выбранную строку модели
+        sel = self.tree.selection()
+        if sel:
+            pos = self.top + self.tree.index(sel[0])
+            if pos != self.selected_pos:
+                self.selected_pos = pos
+                self._selection_changed()
+
+    def _selection_changed(self):
+        if self.on_select is not None:
+            self.on_select(self.rows[self.selected_pos])
+
+    def _on_wheel(self, event):
+        self.yview("scroll", -3 if event.delta > 0 else 3, "units")
+        return "break"
+
+    def _on_configure(self, event):
+        # Высота строки берётся из стиля; одна строка уходит на заголовок
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self._clamp_top()
+            self.render()
+
+
 class MainApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -33,8 +227,24 @@ class MainApp(tk.Tk):
         self.geometry("1000x650")
         self.minsize(900, 500)
 
-        self.company = TransportCompany(name="MyTransportCo")
+        self.company = TransportCompany(name="MyTransportCo", incremental=True, stats=True)
         self.distribution_result = None
+        # Фоновое распределение: очередь результата, флаг отмены, ход работы
+        self._job = None
+        self._cancel = None
+        self._progress = (0, 0)
+        self.progress_dialog = None
+        # Сортировка таблиц: (колонка, по убыванию) или None
+        self.client_sort_state = None
+        self.vehicle_sort_state = None
+        # Журнал изменений открытого файла состояния: Ctrl+S дописывает
+        # только изменения, снимок переписывается фоновым сжатием
+        self.journal = None
+
+        # Результат распределения держит представления строк и готовые итоги:
+        # любое изменение клиентов или транспорта делает его устаревшим
+        self.company.clients.listeners.append(self._on_data_changed)
+        self.company.vehicles.listeners.append(self._on_data_changed)
 
         self._create_menu()
         self._create_toolbar()
@@ -43,17 +253,25 @@ class MainApp(tk.Tk):
         self._create_bindings()
 
         self.set_status("Готово")
+        self.protocol("WM_DELETE_WINDOW", self.quit_app)
+        self.after(JOURNAL_FLUSH_MS, self._flush_journal)
+
+    def _on_data_changed(self, event, row):
+        if event in ("insert", "update", "delete", "extend", "clear"):
+            self.distribution_result = None
 
     def _create_menu(self):
         menubar = tk.Menu(self)
 
         file_menu = tk.Menu(menubar, tearoff=0)
-        file_menu.add_command(label="Сохранить состояние...", command=self.save_state, accelerator="Ctrl+S")
+        file_menu.add_command(label="Сохранить", command=self.save_state, accelerator="Ctrl+S")
+        file_menu.add_command(label="Сохранить состояние как...", command=self.save_state_as)
         file_menu.add_command(label="Загрузить состояние...", command=self.load_state)
+        file_menu.add_command(label="Просмотр базы SQLite...", command=self.browse_database)
         file_menu.add_separator()
         file_menu.add_command(label="Экспорт результата", command=self.export_distribution)
         file_menu.add_separator()
-        file_menu.add_command(label="Выход", command=self.quit)
+        file_menu.add_command(label="Выход", command=self.quit_app)
         menubar.add_cascade(label="Файл", menu=file_menu)
 
         help_menu = tk.Menu(menubar, tearoff=0)
@@ -83,7 +301,8 @@ class MainApp(tk.Tk):
         self.filter_var = tk.StringVar()
         ent_filter = ttk.Entry(frm, textvariable=self.filter_var, width=20)
         ent_filter.pack(side="left")
-        ent_filter.bind("<KeyRelease>", lambda e: self.refresh_clients())
+        ent_filter.bind("<KeyRelease>", lambda e: self._schedule_filter())
+        self._filter_job = None
 
     def _create_main_tables(self):
         main_frame = ttk.Frame(self)
@@ -92,25 +311,21 @@ class MainApp(tk.Tk):
         left = ttk.LabelFrame(main_frame, text="Клиенты")
         left.pack(side="left", fill="both", expand=True, padx=(0,6), pady=2)
 
-        columns_clients = ("name", "weight", "vip")
-        self.client_tree = ttk.Treeview(left, columns=columns_clients, show="headings", selectmode="browse")
-        for col, title in zip(columns_clients, ("Имя", "Вес (т)", "VIP")):
-            self.client_tree.heading(col, text=title, command=lambda c=col: self._sort_tree(self.client_tree, c))
-            self.client_tree.column(col, anchor="center")
-        self.client_tree.pack(fill="both", expand=True, padx=4, pady=4)
-        self.client_tree.bind("<Double-1>", lambda e: self.edit_client())
+        self.client_table = VirtualTable(
+            left, ("name", "weight", "vip"), ("Имя", "Вес (т)", "VIP"),
+            self._client_values, on_heading=self._sort_clients)
+        self.client_table.pack(fill="both", expand=True, padx=4, pady=4)
+        self.client_table.bind_rows("<Double-1>", lambda e: self.edit_client())
 
         right = ttk.LabelFrame(main_frame, text="Транспорт")
         right.pack(side="right", fill="both", expand=True, padx=(6,0), pady=2)
 
-        columns_veh = ("id", "type", "capacity", "load", "clients")
-        self.vehicle_tree = ttk.Treeview(right, columns=columns_veh, show="headings", selectmode="browse")
-        headers = ["ID", "Тип", "Грузоподъёмность (т)", "Текущая загрузка (т)", "Клиентов"]
-        for col, title in zip(columns_veh, headers):
-            self.vehicle_tree.heading(col, text=title, command=lambda c=col: self._sort_tree(self.vehicle_tree, c))
-            self.vehicle_tree.column(col, anchor="center")
-        self.vehicle_tree.pack(fill="both", expand=True, padx=4, pady=4)
-        self.vehicle_tree.bind("<Double-1>", lambda e: self.edit_vehicle())
+        self.vehicle_table = VirtualTable(
+            right, ("id", "type", "capacity", "load", "clients"),
+            ("ID", "Тип", "Грузоподъёмность (т)", "Текущая загрузка (т)", "Клиентов"),
+            self._vehicle_values, on_heading=self._sort_vehicles)
+        self.vehicle_table.pack(fill="both", expand=True, padx=4, pady=4)
+        self.vehicle_table.bind_rows("<Double-1>", lambda e: self.edit_vehicle())
 
     def _create_status_bar(self):
         self.status_var = tk.StringVar(value="")
@@ -133,77 +348,96 @@ class MainApp(tk.Tk):
         ClientForm(self, mode="add")
 
     def edit_client(self):
-        sel = self.client_tree.selection()
-        if not sel:
+        idx = self.client_table.selected()
+        if idx is None:
             return
-        idx = int(self.client_tree.item(sel[0], "tags")[0])
-        ClientForm(self, mode="edit", client_index=idx)
+        ClientForm(self, mode="edit", client_id=self.company.client_registry.id_of(idx))
 
     def add_vehicle(self):
         VehicleForm(self, mode="add")
 
     def edit_vehicle(self):
-        sel = self.vehicle_tree.selection()
-        if not sel:
+        idx = self.vehicle_table.selected()
+        if idx is None:
             return
-        idx = int(self.vehicle_tree.item(sel[0], "tags")[0])
-        VehicleForm(self, mode="edit", vehicle_index=idx)
+        VehicleForm(self, mode="edit", vehicle_id=self.company.vehicles.get_vehicle_id(idx))
 
     def delete_selected(self):
-        if self.client_tree.selection():
-            sel = self.client_tree.selection()[0]
-            idx = int(self.client_tree.item(sel, "tags")[0])
-            client = self.company.clients.pop(idx)
+        # Строка таблицы переводится в ID записи и удаляется через реестр
+        idx = self.client_table.selected()
+        if idx is not None:
+            client = self.company.remove_client(self.company.client_registry.id_of(idx))
             self.refresh_clients()
             self.set_status(f"Клиент '{client.name}' удалён")
             return
 
-        if self.vehicle_tree.selection():
-            sel = self.vehicle_tree.selection()[0]
-            idx = int(self.vehicle_tree.item(sel, "tags")[0])
-            vehicle = self.company.vehicles.pop(idx)
+        idx = self.vehicle_table.selected()
+        if idx is not None:
+            vehicle = self.company.remove_vehicle(self.company.vehicles.get_vehicle_id(idx))
             self.refresh_vehicles()
             self.set_status(f"Транспорт '{vehicle.vehicle_id}' удалён")
             return
 
+    def _client_values(self, row):
+        c = self.company.clients[row]
+        return (c.name, c.cargo_weight, "Да" if c.is_vip else "Нет")
+
+    def _vehicle_values(self, row):
+        v = self.company.vehicles[row]
+        clients_count = len(self.company.allocation.positions_for_vehicle(row))
+        return (v.vehicle_id, v.__class__.__name__, v.capacity, v.current_load, clients_count)
+
+    def _schedule_filter(self):
+        # Быстрый набор даёт один запрос: таймер перезапускается на каждую клавишу
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        self.refresh_clients()
+
     def refresh_clients(self):
-        f = self.filter_var.get().strip().lower()
-        for it in self.client_tree.get_children():
-            self.client_tree.delete(it)
-
-        for idx, c in enumerate(self.company.clients):
-            if f and f not in c.name.lower():
-                continue
-            self.client_tree.insert("", "end",
-                values=(c.name, c.cargo_weight, "Да" if c.is_vip else "Нет"),
-                tags=(str(idx),)
-            )
+        # Строки отбираются индексом имён и упорядочиваются в модели;
+        # Treeview получает только видимое окно
+        f = self.filter_var.get().strip()
+        rows = self.company.find_clients(f)
+        if self.client_sort_state:
+            column, descending = self.client_sort_state
+            rows = self.company.client_sort.rows(
+                CLIENT_SORT_KEYS[column], descending, subset=rows if f else None)
+        self.client_table.set_rows(rows)
 
     def refresh_vehicles(self):
-        for it in self.vehicle_tree.get_children():
-            self.vehicle_tree.delete(it)
-
-        for idx, v in enumerate(self.company.vehicles):
-            clients_count = len(getattr(v, "clients_list", []))
-            self.vehicle_tree.insert("",
-                "end",
-                values=(v.vehicle_id, v.__class__.__name__, v.capacity,
-                        getattr(v, "current_load", 0.0), clients_count),
-                tags=(str(idx),)
-            )
-
-    def _sort_tree(self, tree: ttk.Treeview, col: str):
-        data = [(tree.set(k, col), k) for k in tree.get_children('')]
-        try:
-            data = [(float(v), k) for v, k in data]
-            data.sort()
-        except:
-            data.sort(key=lambda x: x[0])
-
-        for index, (_, k) in enumerate(data):
-            tree.move(k, "", index)
+        # Загрузка и число клиентов меняются распределением без событий
+        sort = self.company.vehicle_sort
+        sort.invalidate(*sort.derived)
+        if self.vehicle_sort_state:
+            column, descending = self.vehicle_sort_state
+            rows = sort.rows(VEHICLE_SORT_KEYS[column], descending)
+        else:
+            rows = range(len(self.company.vehicles))
+        self.vehicle_table.set_rows(rows)
+
+    def _toggle_sort(self, state, column):
+        # Повторный щелчок по заголовку меняет направление
+        if state and state[0] == column:
+            return (column, not state[1])
+        return (column, False)
+
+    def _sort_clients(self, column):
+        self.client_sort_state = self._toggle_sort(self.client_sort_state, column)
+        self.client_table.set_sort_indicator(*self.client_sort_state)
+        self.refresh_clients()
+
+    def _sort_vehicles(self, column):
+        self.vehicle_sort_state = self._toggle_sort(self.vehicle_sort_state, column)
+        self.vehicle_table.set_sort_indicator(*self.vehicle_sort_state)
+        self.refresh_vehicles()
 
     def distribute_cargos(self):
+        if self._job is not None:
+            return
         if not self.company.vehicles:
             show_error("Нет транспорта для распределения.")
             return
@@ -211,35 +445,82 @@ class MainApp(tk.Tk):
             show_error("Нет клиентов для распределения.")
             return
 
+        # Распределение идёт в фоновом потоке; окно опрашивает его через after()
+        self._job = queue.Queue()
+        self._cancel = threading.Event()
+        self._progress = (0, len(self.company.clients))
+        self.company.stats.reset()
+        self._set_busy(True)
+        self.progress_dialog = ProgressDialog(self, on_cancel=self._cancel.set)
+        threading.Thread(
+            target=self._distribution_worker, args=(self._job, self._cancel), daemon=True
+        ).start()
+        self.after(POLL_MS, self._poll_distribution)
+
+    def _distribution_worker(self, job, cancel):
+        # Выполняется вне главного потока: к Tk не обращается
+        def progress(done, total):
+            self._progress = (done, total)
+            if cancel.is_set():
+                raise DistributionCancelled
+
         try:
-            vehicles_after = self.company.optimize_cargo_distribution()
+            job.put(("done", self.company.optimize_cargo_distribution(progress=progress)))
+        except DistributionCancelled:
+            job.put(("cancelled", None))
         except Exception as e:
-            show_error(f"Ошибка при распределении: {e}")
+            job.put(("error", e))
+
+    def _poll_distribution(self):
+        try:
+            status, value = self._job.get_nowait()
+        except queue.Empty:
+            self.progress_dialog.set_progress(*self._progress)
+            self.after(POLL_MS, self._poll_distribution)
             return
 
-        result = []
-        for v in vehicles_after:
-            clients = []
-            for c in getattr(v, "clients_list", []):
-                clients.append({
-                    "name": c.name,
-                    "cargo_weight": c.cargo_weight,
-                    "is_vip": c.is_vip
-                })
-            result.append({
-                "vehicle_id": v.vehicle_id,
-                "type": v.__class__.__name__,
-                "capacity": v.capacity,
-                "current_load": v.current_load,
-                "clients": clients
-            })
-
-        self.distribution_result = result
+        self._job = None
+        self.progress_dialog.destroy()
+        self.progress_dialog = None
+        self._set_busy(False)
         self.refresh_vehicles()
-        self.set_status("Распределение завершено")
-        show_info("Распределение выполнено")
 
-        DistributionResultDialog(self, result)
+        if status == "cancelled":
+            self.distribution_result = None
+            self.set_status("Распределение отменено")
+            return
+        if status == "error":
+            self.distribution_result = None
+            show_error(f"Ошибка при распределении: {value}")
+            return
+
+        if value.message:
+            self.distribution_result = None
+            show_error(value.message)
+            return
+
+        # Результат читается напрямую из таблицы распределения компании
+        self.distribution_result = value
+        self.set_status(f"Распределение завершено: {self.company.stats.summary()}")
+        text = (f"Распределение выполнено\n"
+                f"Утилизация транспорта: {value.utilization:.1%}\n"
+                f"Заполнение спроса: {value.fill_ratio:.1%}\n"
+                f"Разделённых грузов: {value.split_clients}")
+        if value.unallocated_clients:
+            text += (f"\nНе распределено: {value.unallocated:.2f} т "
+                     f"({value.unallocated_clients} клиентов)")
+        show_info(text)
+
+        DistributionResultDialog(self, value)
+
+    def _set_busy(self, busy: bool):
+        state = "disabled" if busy else "normal"
+        for btn in (self.btn_add_client, self.btn_add_vehicle, self.btn_delete, self.btn_distribute):
+            btn.configure(state=state)
+        self.client_table.frozen = busy
+        self.vehicle_table.frozen = busy
+        if busy:
+            self.set_status("Распределение грузов...")
 
     def export_distribution(self):
         if not self.distribution_result:
@@ -247,99 +528,135 @@ class MainApp(tk.Tk):
             return
 
         path = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON files", "*.json")]
+            defaultextension=".ndjson",
+            filetypes=EXPORT_FILETYPES
         )
         if not path:
             return
 
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(self.distribution_result, f, ensure_ascii=False, indent=2)
+            # Запись идёт потоком прямо из таблицы распределения
+            export_distribution(self.company, path, vehicles=self.distribution_result)
             show_info("Результат сохранён.")
         except Exception as e:
             show_error(f"Ошибка при сохранении: {e}")
 
+    def _distribution_running(self):
+        # Фоновый поток переписывает загрузку и таблицу распределения;
+        # снимок и сжатие журнала в это время прочли бы их наполовину
+        if self._job is None:
+            return False
+        show_error("Дождитесь окончания распределения.")
+        return True
+
     def save_state(self):
+        # Пока файл открыт, сохраняются только изменения из журнала
+        if self._distribution_running():
+            return
+        if self.journal is None:
+            self.save_state_as()
+            return
+
+        try:
+            count = self.journal.pending
+            self.journal.flush()
+            self.set_status(f"Сохранено изменений: {count}")
+        except Exception as e:
+            show_error(f"Ошибка сохранения: {e}")
+
+    def save_state_as(self):
+        if self._distribution_running():
+            return
         path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json")]
+            filetypes=STATE_FILETYPES
         )
         if not path:
             return
 
-        data = {
-            "clients": [
-                {
-                    "name": c.name,
-                    "cargo_weight": c.cargo_weight,
-                    "is_vip": c.is_vip
-                }
-                for c in self.company.clients
-            ],
-            "vehicles": []
-        }
-
-        for v in self.company.vehicles:
-            vdata = {
-                "class": v.__class__.__name__,
-                "vehicle_id": v.vehicle_id,
-                "capacity": v.capacity
-            }
-            if isinstance(v, Truck):
-                vdata["color"] = v.color
-            if isinstance(v, Train):
-                vdata["number_of_cars"] = v.number_of_cars
-            data["vehicles"].append(vdata)
-
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._close_journal()
+            journal = Journal(self.company, path)
+            journal.attach()
+            # Полный снимок пишется сразу, дальше Ctrl+S дописывает журнал
+            journal.compact(background=False)
+            self.journal = journal
             show_info("Состояние сохранено.")
         except Exception as e:
             show_error(f"Ошибка сохранения: {e}")
 
     def load_state(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        if self._distribution_running():
+            return
+        path = filedialog.askopenfilename(filetypes=STATE_FILETYPES)
         if not path:
             return
 
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            self.company.clients = []
-            for c in data.get("clients", []):
-                self.company.clients.append(
-                    Client(
-                        name=c["name"],
-                        cargo_weight=float(c["cargo_weight"]),
-                        is_vip=bool(c["is_vip"])
-                    )
-                )
-
-            self.company.vehicles = []
-            for v in data.get("vehicles", []):
-                cls = v["class"]
-                cap = float(v["capacity"])
-
-                if cls == "Truck":
-                    obj = Truck(capacity=cap, color=v.get("color", ""))
-                elif cls == "Train":
-                    obj = Train(capacity=cap, number_of_cars=int(v.get("number_of_cars", 0)))
-                else:
-                    obj = Vehicle(capacity=cap)
-
-                obj.vehicle_id = v.get("vehicle_id", obj.vehicle_id)
-                self.company.vehicles.append(obj)
+            self._close_journal()
+            journal = Journal(self.company, path)
+            replayed = journal.recover()
+            journal.attach()
+            self.journal = journal
 
             self.refresh_clients()
             self.refresh_vehicles()
-            show_info("Состояние загружено.")
+            if journal.stale:
+                show_error("Журнал не подходит к файлу состояния и отложен: "
+                           + ", ".join(journal.stale))
+            if replayed:
+                show_info(f"Состояние загружено, из журнала применено изменений: {replayed}.")
+            else:
+                show_info("Состояние загружено.")
 
         except Exception as e:
+            # Неразобранный файл состояние не меняет, но recover() мог успеть
+            # перенести его до ошибки в attach()
+            self.refresh_clients()
+            self.refresh_vehicles()
             show_error(f"Ошибка загрузки: {e}")
 
+    def _flush_journal(self):
+        # Изменения попадают на диск не позже чем через JOURNAL_FLUSH_MS;
+        # во время распределения сброс (и запускаемое им сжатие) ждёт
+        if self.journal is not None and self._job is None:
+            try:
+                self.journal.flush()
+                if self.journal.compaction_error is not None:
+                    self.set_status(f"Ошибка сжатия журнала: {self.journal.compaction_error}")
+                    self.journal.compaction_error = None
+            except Exception as e:
+                self.set_status(f"Ошибка записи журнала: {e}")
+        self.after(JOURNAL_FLUSH_MS, self._flush_journal)
+
+    def _close_journal(self):
+        if self.journal is not None:
+            journal, self.journal = self.journal, None
+            journal.close()
+
+    def quit_app(self):
+        if self._job is not None:
+            # Закрытие журнала сворачивает его в снимок: сначала поток
+            # распределения должен остановиться
+            self._cancel.set()
+            self.after(POLL_MS, self.quit_app)
+            return
+        try:
+            self._close_journal()
+        except Exception as e:
+            show_error(f"Ошибка записи журнала: {e}")
+        self.quit()
+
+    def browse_database(self):
+        path = filedialog.askopenfilename(filetypes=DATABASE_FILETYPES)
+        if not path:
+            return
+
+        try:
+            DatabaseDialog(self, path)
+        except Exception as e:
+            show_error(f"Ошибка открытия базы: {e}")
+
     def show_about(self):
         text = (
             "Лабораторная работа №12\n"
@@ -349,11 +666,12 @@ class MainApp(tk.Tk):
         messagebox.showinfo("О программе", text)
 
 class ClientForm(tk.Toplevel):
-    def __init__(self, parent: MainApp, mode="add", client_index=None):
+    def __init__(self, parent: MainApp, mode="add", client_id=None):
         super().__init__(parent)
         self.parent = parent
         self.mode = mode
-        self.client_index = client_index
+        # Стабильный ID: пока форма открыта, строки могут сдвинуться
+        self.client_id = client_id
 
         self.title("Клиент — " + ("редактирование" if mode == "edit" else "добавление"))
         self.resizable(False, False)
@@ -387,7 +705,7 @@ class ClientForm(tk.Toplevel):
         self.bind("<Escape>", lambda e: self.destroy())
 
         if mode == "edit":
-            c = parent.company.clients[client_index]
+            c = parent.company.get_client(client_id)
             self.name_var.set(c.name)
             self.weight_var.set(c.cargo_weight)
             self.vip_var.set(c.is_vip)
@@ -408,18 +726,21 @@ class ClientForm(tk.Toplevel):
 
         if self.mode == "add":
             self.parent.company.add_client(cli)
+        elif self.client_id in self.parent.company.client_registry:
+            self.parent.company.update_client(self.client_id, cli)
         else:
-            self.parent.company.clients[self.client_index] = cli
+            show_error("Клиент уже удалён")
+            return
 
         self.parent.refresh_clients()
         self.destroy()
 
 class VehicleForm(tk.Toplevel):
-    def __init__(self, parent: MainApp, mode="add", vehicle_index=None):
+    def __init__(self, parent: MainApp, mode="add", vehicle_id=None):
         super().__init__(parent)
         self.parent = parent
         self.mode = mode
-        self.vehicle_index = vehicle_index
+        self.vehicle_id = vehicle_id
 
         self.title("Транспорт — " + ("редактирование" if mode == "edit" else "добавление"))
         self.resizable(False, False)
@@ -460,7 +781,7 @@ class VehicleForm(tk.Toplevel):
         self.bind("<Escape>", lambda e: self.destroy())
 
         if mode == "edit":
-            v = parent.company.vehicles[vehicle_index]
+            v = parent.company.get_vehicle(vehicle_id)
             self.type_var.set(v.__class__.__name__)
             self.capacity_var.set(v.capacity)
 
@@ -512,14 +833,53 @@ class VehicleForm(tk.Toplevel):
         if self.mode == "add":
             self.parent.company.add_vehicle(obj)
         else:
-            old = self.parent.company.vehicles[self.vehicle_index]
-            obj.vehicle_id = old.vehicle_id
-            self.parent.company.vehicles[self.vehicle_index] = obj
+            try:
+                self.parent.company.update_vehicle(self.vehicle_id, obj)
+            except KeyError:
+                show_error("Транспорт уже удалён")
+                return
 
         self.parent.refresh_vehicles()
         self.destroy()
 
+class ProgressDialog(tk.Toplevel):
+    def __init__(self, parent: MainApp, on_cancel):
+        super().__init__(parent)
+        self.on_cancel = on_cancel
+
+        self.title("Распределение грузов")
+        self.resizable(False, False)
+        self.transient(parent)
+        self.grab_set()
+
+        frm = ttk.Frame(self)
+        frm.pack(padx=10, pady=10)
+
+        self.text_var = tk.StringVar(value="Подготовка...")
+        ttk.Label(frm, textvariable=self.text_var, width=40).pack(anchor="w")
+        self.bar = ttk.Progressbar(frm, length=300, mode="determinate")
+        self.bar.pack(pady=8)
+        self.btn_cancel = ttk.Button(frm, text="Отмена", command=self.cancel)
+        self.btn_cancel.pack()
+
+        # Закрытие окна и Escape отменяют распределение, окно закрывает MainApp
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.bind("<Escape>", lambda e: self.cancel() or "break")
+
+    def set_progress(self, done, total):
+        self.bar.configure(maximum=max(total, 1), value=done)
+        if str(self.btn_cancel["state"]) != "disabled":
+            self.text_var.set(f"Распределено клиентов: {done} из {total}")
+
+    def cancel(self):
+        self.btn_cancel.configure(state="disabled")
+        self.text_var.set("Отмена...")
+        self.on_cancel()
+
+
 class DistributionResultDialog(tk.Toplevel):
+    # Строки транспорта и его грузов подгружаются окнами по мере прокрутки;
+    # грузы выбранного транспорта берутся из индекса таблицы распределения
     def __init__(self, parent: MainApp, result):
         super().__init__(parent)
         self.title("Результат распределения")
@@ -527,58 +887,133 @@ class DistributionResultDialog(tk.Toplevel):
         self.transient(parent)
         self.grab_set()
 
+        self.result = result
+        self.vehicles = parent.company.vehicles
+        self.allocation = parent.company.allocation
+
         frm = ttk.Frame(self)
         frm.pack(fill="both", expand=True, padx=8, pady=8)
 
         left = ttk.LabelFrame(frm, text="Транспорт")
         left.pack(side="left", fill="both", expand=True)
 
-        cols = ("id", "type", "cap", "load", "count")
-        self.tv = ttk.Treeview(left, columns=cols, show="headings")
-        headers = ["ID", "Тип", "Вместимость", "Загрузка", "Клиентов"]
-        for c, h in zip(cols, headers):
-            self.tv.heading(c, text=h)
+        self.tv = VirtualTable(
+            left, ("id", "type", "cap", "load", "count"),
+            ("ID", "Тип", "Вместимость", "Загрузка", "Клиентов"),
+            self._vehicle_values, on_select=self._on_select)
         self.tv.pack(fill="both", expand=True)
-
-        for v in result:
-            self.tv.insert("", "end",
-                values=(
-                    v["vehicle_id"],
-                    v["type"],
-                    v["capacity"],
-                    v["current_load"],
-                    len(v["clients"])
-                )
-            )
+        self.tv.set_rows(range(len(result)))
 
         right = ttk.LabelFrame(frm, text="Клиенты транспорта")
         right.pack(side="right", fill="both", expand=True)
 
-        cols2 = ("name", "weight", "vip")
-        self.clients_tv = ttk.Treeview(right, columns=cols2, show="headings")
-        for c, h in zip(cols2, ["Имя", "Вес", "VIP"]):
-            self.clients_tv.heading(c, text=h)
+        self.clients_tv = VirtualTable(
+            right, ("name", "weight", "vip"), ("Имя", "Вес", "VIP"), self._part_values)
         self.clients_tv.pack(fill="both", expand=True)
 
-        def on_select(_):
-            self.clients_tv.delete(*self.clients_tv.get_children())
-            sel = self.tv.selection()
-            if not sel:
-                return
-            row = self.tv.item(sel[0])["values"]
-            vid = row[0]
-            for v in result:
-                if v["vehicle_id"] == vid:
-                    for cli in v["clients"]:
-                        self.clients_tv.insert(
-                            "", "end",
-                            values=(cli["name"], cli["cargo_weight"], "Да" if cli["is_vip"] else "Нет")
-                        )
-
-        self.tv.bind("<<TreeviewSelect>>", on_select)
-
         ttk.Button(self, text="Закрыть", command=self.destroy).pack(pady=6)
 
+    def _positions(self, idx):
+        return self.allocation.positions_for_vehicle(self.vehicles.row_for(self.result[idx]))
+
+    def _vehicle_values(self, idx):
+        v = self.result[idx]
+        return (v.vehicle_id, v.__class__.__name__, v.capacity, v.current_load,
+                len(self._positions(idx)))
+
+    def _part_values(self, pos):
+        part = AllocationPart(self.allocation, pos)
+        return (part.name, part.cargo_weight, "Да" if part.is_vip else "Нет")
+
+    def _on_select(self, idx):
+        # Позиции грузов транспорта — готовый список индекса, без копирования
+        self.clients_tv.set_rows(self._positions(idx))
+
+class DatabaseDialog(tk.Toplevel):
+    # Просмотр базы SQLite без загрузки в память: таблицы получают
+    # постраничные запросы, фильтр и сортировка выполняются в базе
+    def __init__(self, parent: MainApp, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.db = CompanyDatabase(path)
+        super().__init__(parent)
+        self.title(f"База: {os.path.basename(path)}")
+        self.geometry("900x500")
+        self.transient(parent)
+
+        self.client_sort_state = None
+        self.vehicle_sort_state = None
+        self._filter_job = None
+
+        top = ttk.Frame(self)
+        top.pack(fill="x", padx=8, pady=(8, 0))
+        ttk.Label(top, text="Фильтр клиентов:").pack(side="left")
+        self.filter_var = tk.StringVar()
+        ent_filter = ttk.Entry(top, textvariable=self.filter_var, width=30)
+        ent_filter.pack(side="left", padx=4)
+        ent_filter.bind("<KeyRelease>", lambda e: self._schedule_filter())
+        self.count_var = tk.StringVar()
+        ttk.Label(top, textvariable=self.count_var).pack(side="left", padx=8)
+
+        frm = ttk.Frame(self)
+        frm.pack(fill="both", expand=True, padx=8, pady=8)
+
+        left = ttk.LabelFrame(frm, text="Клиенты")
+        left.pack(side="left", fill="both", expand=True)
+        self.client_table = VirtualTable(
+            left, ("name", "weight", "vip"), ("Имя", "Вес (т)", "VIP"),
+            self._client_values, on_heading=self._sort_clients)
+        self.client_table.pack(fill="both", expand=True)
+
+        right = ttk.LabelFrame(frm, text="Транспорт")
+        right.pack(side="right", fill="both", expand=True)
+        self.vehicle_table = VirtualTable(
+            right, ("id", "type", "capacity", "load", "clients"),
+            ("ID", "Тип", "Грузоподъёмность (т)", "Текущая загрузка (т)", "Клиентов"),
+            lambda record: record[1:], on_heading=self._sort_vehicles)
+        self.vehicle_table.pack(fill="both", expand=True)
+
+        ttk.Button(self, text="Закрыть", command=self.destroy).pack(pady=(0, 6))
+        self.bind("<Escape>", lambda e: self.destroy())
+
+        self.refresh_clients()
+        self.refresh_vehicles()
+
+    def destroy(self):
+        self.db.close()
+        super().destroy()
+
+    def _client_values(self, record):
+        _, name, weight, vip = record
+        return (name, weight, "Да" if vip else "Нет")
+
+    def _schedule_filter(self):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self.refresh_clients)
+
+    def refresh_clients(self):
+        self._filter_job = None
+        column, descending = self.client_sort_state or (None, False)
+        rows = self.db.clients(self.filter_var.get(),
+                               CLIENT_SORT_KEYS.get(column), descending)
+        self.client_table.set_rows(rows)
+        self.count_var.set(f"Найдено: {len(rows)}")
+
+    def refresh_vehicles(self):
+        column, descending = self.vehicle_sort_state or (None, False)
+        self.vehicle_table.set_rows(self.db.vehicles(VEHICLE_SORT_KEYS.get(column), descending))
+
+    def _sort_clients(self, column):
+        self.client_sort_state = self.master._toggle_sort(self.client_sort_state, column)
+        self.client_table.set_sort_indicator(*self.client_sort_state)
+        self.refresh_clients()
+
+    def _sort_vehicles(self, column):
+        self.vehicle_sort_state = self.master._toggle_sort(self.vehicle_sort_state, column)
+        self.vehicle_table.set_sort_indicator(*self.vehicle_sort_state)
+        self.refresh_vehicles()
+
 def main():
     app = MainApp()
     app.refresh_clients()
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from transport.cache import ResultCache
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Truck
+
+RUNS = [{}, {"engine": "numpy"}, {"strategy": "first_fit"}, {"strategy": "best_fit"}]
+
+
+def _snapshot(company, result):
+    table = company.allocation
+    return (list(table.vehicle_rows), list(table.client_rows), list(table.weights),
+            list(company.vehicles.loads), [v.vehicle_id for v in result],
+            list(result.short_rows), list(result.short_amounts), result.message)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_cached_result_matches_fresh(seed):
+    pytest.importorskip("numpy")
+    rnd = random.Random(seed)
+    cached = TransportCompany("a", stats=True, cache_entries=rnd.choice([1, 3, 8]))
+    fresh = TransportCompany("b", cache_entries=0)
+    companies = (cached, fresh)
+
+    for i in range(rnd.randint(1, 5)):
+        capacity = float(rnd.randint(1, 20))
+        for company in companies:
+            truck = Truck(capacity, "r")
+            truck.vehicle_id = f"v{i}"
+            company.add_vehicle(truck)
+    for i in range(rnd.randint(1, 12)):
+        weight, vip = float(rnd.randint(1, 9)), rnd.random() < 0.3
+        for company in companies:
+            company.add_client(Client(f"c{i}", weight, vip))
+
+    for step in range(30):
+        op = rnd.random()
+        n, m = len(cached.clients), len(cached.vehicles)
+        # Правки, после которых содержимое возвращается к прежнему, дают попадания
+        if op < 0.25:
+            row, weight = rnd.randrange(n), float(rnd.choice([2, 3]))
+            for company in companies:
+                company.clients[row].cargo_weight = weight
+        elif op < 0.35:
+            for company in companies:
+                company.add_client(Client("x", 3.0))
+        elif op < 0.45 and n > 1:
+            row = rnd.randrange(n)
+            for company in companies:
+                company.clients.pop(row)
+        elif op < 0.55:
+            row, capacity = rnd.randrange(m), float(rnd.choice([5, 10]))
+            for company in companies:
+                company.vehicles[row].capacity = capacity
+
+        kwargs = rnd.choice(RUNS)
+        got = cached.optimize_cargo_distribution(**kwargs)
+        expected = fresh.optimize_cargo_distribution(**kwargs)
+        assert _snapshot(cached, got) == _snapshot(fresh, expected), (step, kwargs)
+        assert got.metrics() == expected.metrics()
+
+
+def test_repeat_is_a_hit():
+    company = TransportCompany("hit", stats=True)
+    company.add_vehicle(Truck(10.0, "r"))
+    company.add_client(Client("А", 4.0))
+    company.optimize_cargo_distribution()
+    company.optimize_cargo_distribution()
+    assert company.stats.counters.get("cache_hits") == 1
+
+    company.clients[0].cargo_weight = 5.0
+    company.optimize_cargo_distribution()
+    assert company.stats.counters.get("cache_hits") == 1
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2, max_bytes=100)
+    cache.put("a", {"x": b"1" * 10})
+    cache.put("b", {"x": b"2" * 10})
+    assert cache.get("a") is not None
+    cache.put("c", {"x": b"3" * 10})
+    # "b" использовался давнее всех
+    assert list(cache.entries) == ["a", "c"]
+
+    cache.put("d", {"x": b"4" * 95})
+    assert list(cache.entries) == ["d"]
+    assert cache.size == 95
+
+    cache.put("e", {"x": b"5" * 101})
+    assert cache.get("e") is None
+    assert len(cache) == 1
+
+
+def test_incremental_split_keeps_plan():
+    company = TransportCompany("inc", incremental=True, stats=True)
+    company.add_vehicle(Truck(10.0, "r"))
+    company.add_vehicle(Truck(6.0, "r"))
+    company.add_client(Client("А", 4.0))
+    company.add_client(Client("Б", 9.0, True))
+
+    company.optimize_cargo_distribution()
+    company.optimize_cargo_distribution(strategy="first_fit")
+    assert company._plan is None
+    # Состояние то же, что при первом вызове, но план нужен для починки
+    company.optimize_cargo_distribution()
+    assert company._plan is not None
+
+    company.add_client(Client("В", 2.0))
+    assert company._plan is not None
+    assert list(company.vehicles.loads) == [10.0, 5.0]
@@ -0,0 +1,77 @@
+import random
+from array import array
+
+import pytest
+
+from transport import vectorized
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Train, Truck
+
+WEIGHTS = [0, 0.1, 0.2, 0.5, 1, 2.5, 7, 15, 33, 0.7]
+CAPACITIES = [0, 5, 10, 12.5, 20, 40, 0.3]
+
+
+def _snapshot(company):
+    table = company.allocation
+    return (list(table.vehicle_rows), list(table.client_rows), list(table.weights),
+            list(company.vehicles.loads))
+
+
+def _full(company):
+    # Полный пересчёт на копии тех же данных
+    full = TransportCompany("full")
+    for vehicle in company.vehicles:
+        full.add_vehicle(Truck(vehicle.capacity, "x"))
+    for client in company.clients:
+        full.add_client(Client(client.name, client.cargo_weight, client.is_vip))
+    full.optimize_cargo_distribution()
+    return _snapshot(full)
+
+
+def _edit(company, rnd):
+    clients, vehicles = company.clients, company.vehicles
+    nc, nv = len(clients), len(vehicles)
+    op = rnd.randrange(9)
+    if op == 0:
+        company.add_client(Client("n", rnd.choice(WEIGHTS), rnd.random() < 0.3))
+    elif op == 1 and nc > 1:
+        clients.pop(rnd.randrange(nc))
+    elif op == 2 and nc:
+        clients[rnd.randrange(nc)] = Client("e", rnd.choice(WEIGHTS), rnd.random() < 0.3)
+    elif op == 3 and nc:
+        clients[rnd.randrange(nc)].cargo_weight = rnd.choice(WEIGHTS)
+    elif op == 4:
+        company.add_vehicle(Train(rnd.choice(CAPACITIES), 2))
+    elif op == 5 and nv > 1:
+        vehicles.pop(rnd.randrange(nv))
+    elif op == 6 and nv:
+        vehicles[rnd.randrange(nv)] = Truck(rnd.choice(CAPACITIES), "q")
+    elif op == 7 and nv:
+        vehicles[rnd.randrange(nv)].capacity = rnd.choice(CAPACITIES)
+    elif op == 8 and nc:
+        clients[rnd.randrange(nc)].is_vip = rnd.random() < 0.5
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_incremental_matches_full(seed):
+    rnd = random.Random(seed)
+    company = TransportCompany("inc", incremental=True)
+    for _ in range(rnd.randint(1, 8)):
+        company.add_vehicle(Truck(rnd.choice(CAPACITIES), "r"))
+    for i in range(rnd.randint(1, 30)):
+        company.add_client(Client(f"c{i}", rnd.choice(WEIGHTS), rnd.random() < 0.3))
+    company.optimize_cargo_distribution()
+
+    for step in range(25):
+        _edit(company, rnd)
+        # План чинится, а не сбрасывается
+        assert company._plan is not None, step
+        assert _snapshot(company) == _full(company), step
+
+
+def test_shifted_rows_without_numpy(monkeypatch):
+    rows = array("q", [0, 3, 5, 2, 5, -1])
+    expected = vectorized.shifted_rows(rows, 2)
+    monkeypatch.setattr(vectorized, "np", None)
+    assert vectorized.shifted_rows(rows, 2) == expected == array("q", [0, 2, 4, 2, 4, -1])
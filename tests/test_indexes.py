@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Train, Truck
+
+ALPHABET = "abАб"
+
+
+def _name(rnd):
+    return "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(2, 7)))
+
+
+def _edit(company, rnd):
+    clients, vehicles = company.clients, company.vehicles
+    op = rnd.randrange(10)
+    if op == 0:
+        company.add_client(Client(_name(rnd), float(rnd.randint(1, 5)), rnd.random() < 0.3))
+    elif op == 1 and len(clients):
+        clients.pop(rnd.randrange(len(clients)))
+    elif op == 2 and len(clients):
+        clients[rnd.randrange(len(clients))] = Client(_name(rnd), 2.0)
+    elif op == 3 and len(clients):
+        clients[rnd.randrange(len(clients))].name = _name(rnd)
+    elif op == 4 and len(clients):
+        clients[rnd.randrange(len(clients))].cargo_weight = float(rnd.randint(1, 5))
+    elif op == 5:
+        clients.extend_columns({"names": [_name(rnd) for _ in range(3)],
+                                "weights": [3.0, 1.0, 2.0], "vip": [0, 1, 0]})
+    elif op == 6:
+        company.add_vehicle(Truck(float(rnd.randint(1, 9)), "r") if rnd.random() < 0.5
+                            else Train(float(rnd.randint(1, 9)), 2))
+    elif op == 7 and len(vehicles):
+        vehicles.pop(rnd.randrange(len(vehicles)))
+    elif op == 8 and len(vehicles):
+        vehicles[rnd.randrange(len(vehicles))].capacity = float(rnd.randint(1, 9))
+    elif op == 9 and len(clients) and len(vehicles):
+        company.optimize_cargo_distribution()
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_name_search_matches_scan(seed):
+    rnd = random.Random(seed)
+    company = TransportCompany("names")
+    for _ in range(rnd.randint(0, 20)):
+        company.add_client(Client(_name(rnd), 1.0))
+
+    for step in range(60):
+        _edit(company, rnd)
+        # Поиск без учёта регистра, в том числе по заглавным буквам
+        query = "".join(rnd.choice(ALPHABET + "AБ") for _ in range(rnd.randint(0, 4)))
+        expected = [row for row, name in enumerate(company.clients.names)
+                    if query.lower() in name.lower()]
+        assert list(company.find_clients(query)) == expected, step
+
+
+def _client_key(company, column):
+    clients = company.clients
+    return {
+        "name": lambda r: clients.names[r],
+        "cargo_weight": lambda r: clients.weights[r],
+        "is_vip": lambda r: not clients.vip[r],    # VIP первыми
+    }[column]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_sort_index_matches_sorted(seed):
+    rnd = random.Random(seed)
+    company = TransportCompany("sort", incremental=rnd.random() < 0.5)
+    for _ in range(rnd.randint(0, 15)):
+        company.add_client(Client(_name(rnd), float(rnd.randint(1, 5)), rnd.random() < 0.3))
+
+    for step in range(40):
+        _edit(company, rnd)
+        n = len(company.clients)
+        for column in ("name", "cargo_weight", "is_vip"):
+            descending = rnd.random() < 0.5
+            # Обратный порядок — разворот прямого, равные значения тоже
+            expected = sorted(range(n), key=_client_key(company, column))
+            if descending:
+                expected.reverse()
+            rows = company.client_sort.rows(column, descending)
+            assert list(rows) == expected, (step, column, descending)
+
+            subset = [row for row in range(n) if rnd.random() < 0.5]
+            assert list(company.client_sort.rows(column, descending, subset=subset)) == \
+                [row for row in expected if row in subset]
+
+
+def test_vehicle_sort_by_load():
+    company = TransportCompany("load")
+    for capacity in (10.0, 30.0, 20.0):
+        company.add_vehicle(Truck(capacity, "r"))
+    company.add_client(Client("Большой", 25.0))
+    company.add_client(Client("Малый", 12.0))
+    company.optimize_cargo_distribution()
+
+    sort = company.vehicle_sort
+    sort.invalidate(*sort.derived)
+    loads = company.vehicles.loads
+    assert [loads[row] for row in sort.rows("current_load")] == sorted(loads)
@@ -0,0 +1,138 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from transport import journal as journal_module
+from transport.client import Client
+from transport.journal import Journal
+from transport.transportcompany import TransportCompany
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Первый процесс сохраняет снимок, дописывает правки в журнал (Ctrl+S) и
+# завершается без close(); второй, с другим PYTHONHASHSEED, восстанавливает
+WRITER = textwrap.dedent("""
+    import sys
+    from transport.client import Client
+    from transport.journal import Journal
+    from transport.transportcompany import TransportCompany
+    from transport.vehicle import Truck
+
+    company = TransportCompany("Writer")
+    for i in range(20):
+        company.add_client(Client(f"Клиент {i}", float(i + 1), i % 4 == 0))
+    truck = Truck(100.0, "красный")
+    truck.vehicle_id = "T-1"
+    company.add_vehicle(truck)
+
+    journal = Journal(company, sys.argv[1])
+    journal.attach()
+    journal.compact(background=False)
+
+    company.add_client(Client("После снимка", 7.5, True))
+    company.clients.pop(0)
+    company.clients[3] = Client("Правка", 2.0, False)
+    journal.flush()
+""")
+
+READER = textwrap.dedent("""
+    import json
+    import sys
+    from transport.journal import Journal
+    from transport.transportcompany import TransportCompany
+
+    company = TransportCompany("Reader")
+    journal = Journal(company, sys.argv[1])
+    replayed = journal.recover()
+    print(json.dumps({
+        "replayed": replayed,
+        "clients": [[c.name, c.cargo_weight, c.is_vip] for c in company.clients],
+        "vehicles": [v.vehicle_id for v in company.vehicles],
+    }))
+""")
+
+
+def _run(script, path, seed):
+    env = dict(os.environ, PYTHONHASHSEED=str(seed), PYTHONPATH=ROOT)
+    done = subprocess.run([sys.executable, "-c", script, path], env=env, cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return done.stdout
+
+
+@pytest.mark.parametrize("ext", [".json", ".tcs", ".tcsnap", ".sqlite"])
+def test_recover_in_new_process(tmp_path, ext):
+    path = str(tmp_path / f"state{ext}")
+    _run(WRITER, path, 1)
+    state = json.loads(_run(READER, path, 2))
+
+    assert state["replayed"] == 3
+    names = [name for name, _, _ in state["clients"]]
+    assert len(names) == 20
+    assert names[0] == "Клиент 1"
+    assert names[3] == "Правка"
+    assert names[-1] == "После снимка"
+    assert state["clients"][-1] == ["После снимка", 7.5, True]
+    assert state["vehicles"] == ["T-1"]
+
+
+def test_close_compacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "COMPACT_MIN_RECORDS", 2)
+    path = str(tmp_path / "state.json")
+    company = TransportCompany("A")
+    journal = Journal(company, path)
+    journal.attach()
+    company.add_client(Client("Первый", 1.0))
+    company.add_client(Client("Второй", 2.0))
+    journal.close()
+
+    with open(path + ".journal", encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+    restored = TransportCompany("B")
+    assert Journal(restored, path).recover() == 0
+    assert [c.name for c in restored.clients] == ["Первый", "Второй"]
+
+
+def test_close_keeps_short_journal(tmp_path):
+    path = str(tmp_path / "state.json")
+    company = TransportCompany("A")
+    journal = Journal(company, path)
+    journal.attach()
+    journal.compact(background=False)
+    company.add_client(Client("Первый", 1.0))
+    journal.close()
+
+    restored = TransportCompany("B")
+    assert Journal(restored, path).recover() == 1
+    assert [c.name for c in restored.clients] == ["Первый"]
+
+
+def test_unmatched_journal_is_kept(tmp_path):
+    path = str(tmp_path / "state.json")
+    company = TransportCompany("A")
+    journal = Journal(company, path)
+    journal.attach()
+    journal.compact(background=False)
+    company.add_client(Client("В журнале", 1.0))
+    journal.flush()
+
+    # Снимок подменён чужим состоянием: журнал к нему не подходит
+    other = TransportCompany("B")
+    other.add_client(Client("Чужой", 3.0))
+    other_journal = Journal(other, str(tmp_path / "other.json"))
+    other_journal.attach()
+    other_journal.compact(background=False)
+    os.replace(tmp_path / "other.json", path)
+
+    restored = TransportCompany("C")
+    reopened = Journal(restored, path)
+    assert reopened.recover() == 0
+    reopened.attach()
+    assert reopened.stale == [path + ".journal.stale"]
+    with open(reopened.stale[0], encoding="utf-8") as f:
+        assert "В журнале" in f.read()
+    reopened.close()
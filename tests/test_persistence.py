@@ -0,0 +1,72 @@
+import pytest
+
+from transport.client import Client
+from transport.persistence import load_company, save_company
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Train, Truck, Vehicle
+
+FORMATS = [".json", ".ndjson", ".tcs", ".tcsnap", ".sqlite"]
+
+
+def _company():
+    company = TransportCompany("Исходная")
+    for i in range(30):
+        company.add_client(Client(f"Клиент «{i}»", 0.5 + i * 1.25, i % 3 == 0))
+    truck = Truck(40.0, "синий")
+    truck.vehicle_id = "T-01"
+    company.add_vehicle(truck)
+    company.add_vehicle(Train(120.0, 4))
+    company.add_vehicle(Vehicle(15.5))
+    company.add_vehicle(Truck(0.0, "без места"))
+    company.optimize_cargo_distribution()
+    return company
+
+
+def _vehicles(company):
+    return [(v.__class__.__name__, v.vehicle_id, v.capacity, getattr(v, "color", None),
+             getattr(v, "number_of_cars", None)) for v in company.vehicles]
+
+
+@pytest.mark.parametrize("ext", FORMATS)
+def test_round_trip(tmp_path, ext):
+    company = _company()
+    path = str(tmp_path / f"state{ext}")
+    save_company(company, path)
+
+    restored = TransportCompany("Новая")
+    restored.add_client(Client("Лишний", 1.0))
+    load_company(restored, path)
+
+    clients = restored.clients
+    assert list(clients.names) == list(company.clients.names)
+    assert list(clients.weights) == list(company.clients.weights)
+    assert [bool(v) for v in clients.vip] == [bool(v) for v in company.clients.vip]
+    assert _vehicles(restored) == _vehicles(company)
+    assert restored.fingerprint == company.fingerprint
+
+
+@pytest.mark.parametrize("ext", FORMATS)
+def test_round_trip_empty(tmp_path, ext):
+    path = str(tmp_path / f"empty{ext}")
+    save_company(TransportCompany("Пустая"), path)
+
+    restored = _company()
+    load_company(restored, path)
+    assert len(restored.clients) == 0
+    assert len(restored.vehicles) == 0
+    assert len(restored.allocation) == 0
+
+
+def test_sqlite_keeps_allocation(tmp_path):
+    company = _company()
+    path = str(tmp_path / "state.sqlite")
+    save_company(company, path)
+
+    restored = TransportCompany("Новая")
+    load_company(restored, path)
+    table, expected = restored.allocation, company.allocation
+    assert len(table) > 0
+    assert list(table.vehicle_rows) == list(expected.vehicle_rows)
+    assert list(table.client_rows) == list(expected.client_rows)
+    assert list(table.weights) == list(expected.weights)
+    assert list(restored.vehicles.loads) == list(company.vehicles.loads)
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from transport.client import Client
+from transport.persistence import load_company, save_company
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Truck
+
+
+def _check(company, dead):
+    registry = company.client_registry
+    ids = list(company.clients.ids)
+    assert list(registry) == ids
+    for row, row_id in enumerate(ids):
+        assert row_id in registry
+        assert registry.row(row_id) == row
+        assert registry.id_of(row) == row_id
+    for row_id in dead:
+        assert row_id not in registry
+        with pytest.raises(KeyError):
+            registry.row(row_id)
+
+    vehicles = company.vehicle_registry
+    for row in range(len(company.vehicles)):
+        vehicle_id = company.vehicles.get_vehicle_id(row)
+        assert vehicles.row(vehicles.find(vehicle_id)) == row
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rows_follow_ids(tmp_path, seed):
+    rnd = random.Random(seed)
+    company = TransportCompany("reg")
+    dead = set()
+    for step in range(300):
+        op = rnd.random()
+        n = len(company.clients)
+        if op < 0.3:
+            company.add_client(Client("Аб", 1.0))
+        elif op < 0.35:
+            company.clients.extend_columns({"names": ["Ма"] * 3, "weights": [1.0] * 3, "vip": [0] * 3})
+        elif op < 0.55 and n:
+            row = rnd.choice([0, n - 1, rnd.randrange(n)])
+            dead.add(company.clients.ids[row])
+            if rnd.random() < 0.5:
+                company.clients.pop(row)
+            else:
+                company.remove_client(company.clients.ids[row])
+        elif op < 0.6 and n:
+            client_id = company.clients.ids[rnd.randrange(n)]
+            company.update_client(client_id, Client("Правка", 2.0))
+            assert company.get_client(client_id).name == "Правка"
+        elif op < 0.62:
+            dead.update(company.clients.ids)
+            company.clients = []
+        elif op < 0.63:
+            path = str(tmp_path / f"reg{step}.tcsnap")
+            save_company(company, path)
+            dead.update(company.clients.ids)
+            load_company(company, path)
+        elif op < 0.8:
+            truck = Truck(10.0, "r")
+            if rnd.random() < 0.3:
+                truck.vehicle_id = f"C{step}"
+            company.add_vehicle(truck)
+        elif op < 0.88 and len(company.vehicles):
+            vehicle_id = company.vehicles.get_vehicle_id(rnd.randrange(len(company.vehicles)))
+            if rnd.random() < 0.5:
+                company.remove_vehicle(vehicle_id)
+                with pytest.raises(KeyError):
+                    company.get_vehicle(vehicle_id)
+            else:
+                company.get_vehicle(vehicle_id).vehicle_id = f"N{step}"
+                assert company.get_vehicle(f"N{step}").vehicle_id == f"N{step}"
+        if step % 25 == 0:
+            _check(company, dead)
+    _check(company, dead)
+
+
+def test_stale_row_is_detected():
+    company = TransportCompany("stale")
+    for name in ("А", "Б", "В"):
+        company.add_client(Client(name, 1.0))
+    registry = company.client_registry
+    row = 2
+    client_id = registry.id_of(row)
+    version = registry.version
+
+    company.clients.pop(0)
+    assert registry.version != version
+    assert not registry.is_current(row, client_id)
+    assert registry.row(client_id) == 1
+    assert registry.get(client_id).name == "В"
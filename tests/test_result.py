@@ -0,0 +1,27 @@
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Truck
+
+
+def test_result_ignores_later_edits():
+    company = TransportCompany("res")
+    company.add_vehicle(Truck(10.0, "r"))
+    company.add_client(Client("Большой", 12.0, True))
+    company.add_client(Client("Малый", 3.0))
+    result = company.optimize_cargo_distribution(strategy="first_fit")
+
+    # Правки после распределения: сдвиг строк, новый вес, новый транспорт
+    company.clients.pop(0)
+    company.add_client(Client("Новый", 50.0))
+    company.clients[0].cargo_weight = 7.0
+    company.add_vehicle(Truck(40.0, "b"))
+    company.optimize_cargo_distribution()
+
+    # Метрики впервые считаются уже после правок
+    metrics = result.metrics()
+    assert list(result.shortfalls()) == [("Большой", 12.0)]
+    assert metrics["vehicles"] == 1
+    assert metrics["capacity"] == 10.0
+    assert metrics["load"] == 3.0
+    assert metrics["fill_ratio"] == 3.0 / 15.0
+    assert metrics["splits"] == 0
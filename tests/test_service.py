@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from transport.service import DistributionService
+from transport.transportcompany import TransportCompany
+
+
+async def _session(port, requests):
+    # Запросы одной пачкой, ответы — по строке на запрос в том же порядке
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for request in requests:
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def _serve(company, sessions, **kwargs):
+    async def run():
+        service = DistributionService(company, port=0, **kwargs)
+        await service.start()
+        try:
+            return await asyncio.gather(*(_session(service.port, s) for s in sessions))
+        finally:
+            await service.close()
+    return asyncio.run(run())
+
+
+def test_concurrent_registrations():
+    company = TransportCompany("Сервис")
+    sessions = [
+        [{"op": "client", "name": f"к{c}-{i}", "cargo_weight": 1 + i % 5, "is_vip": i % 7 == 0}
+         for i in range(300)]
+        + [{"op": "vehicle", "type": "Truck", "capacity": 50, "color": "red"} for _ in range(5)]
+        # "ok" — регистрация принята в очередь; flush ждёт её записи в компанию
+        + [{"op": "flush"}]
+        for c in range(8)
+    ]
+    responses = _serve(company, sessions, queue_size=64, batch_size=32)
+
+    assert all(r == {"ok": True} for session in responses for r in session[:-1])
+    assert len(company.clients) == 8 * 300
+    assert len(company.vehicles) == 8 * 5
+    assert len(set(company.clients.names)) == 8 * 300
+
+
+def test_distribute_sees_accepted_registrations():
+    company = TransportCompany("Сервис")
+    session = [
+        {"op": "vehicle", "type": "Train", "capacity": 30, "number_of_cars": 3},
+        {"op": "client", "name": "А", "cargo_weight": 20, "is_vip": True},
+        {"op": "client", "name": "Б", "cargo_weight": "15"},
+        {"op": "distribute", "strategy": "first_fit"},
+        {"op": "status"},
+    ]
+    (responses,) = _serve(company, [session])
+
+    distribute, status = responses[3], responses[4]
+    assert distribute["ok"]
+    assert distribute["fingerprint"] == company.fingerprint
+    assert distribute["unallocated"] == 15.0
+    assert status == {"ok": True, "queued": 0, "clients": 2, "vehicles": 1}
+
+
+def test_invalid_requests_are_rejected():
+    company = TransportCompany("Сервис")
+    session = [
+        {"op": "client", "name": "Без веса"},
+        {"op": "client", "name": "Строка", "cargo_weight": "много"},
+        {"op": "client", "name": 5, "cargo_weight": 1},
+        {"op": "client", "name": "NaN", "cargo_weight": float("nan")},
+        {"op": "vehicle", "type": "Ship", "capacity": 10},
+        {"op": "teleport"},
+        {"op": "flush"},
+    ]
+    (responses,) = _serve(company, [session])
+
+    assert [r["ok"] for r in responses] == [False] * 6 + [True]
+    assert all(r["error"] for r in responses[:6])
+    assert responses[-1] == {"ok": True, "clients": 0, "vehicles": 0}
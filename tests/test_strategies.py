@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Train, Truck
+
+WEIGHTS = [0, 0.5, 1, 2, 2.5, 3, 7, 15, 33]
+CAPACITIES = [0, 3, 5, 7.5, 10, 20, 40]
+
+
+def _reference(weights, vip, capacities, best):
+    # Перебор всего транспорта для каждого клиента: первый подходящий
+    # (first_fit) или с наименьшим подходящим свободным местом (best_fit)
+    clients = sorted(range(len(weights)), key=lambda r: (not vip[r], -weights[r]))
+    vehicles = sorted(range(len(capacities)), key=lambda r: -capacities[r])
+    loads = [0.0] * len(capacities)
+    parts = []
+    for row in clients:
+        weight = weights[row]
+        if weight <= 0:
+            continue
+        fits = [v for v in vehicles if capacities[v] - loads[v] >= weight]
+        if not fits:
+            continue
+        v_row = min(fits, key=lambda v: capacities[v] - loads[v]) if best else fits[0]
+        parts.append((v_row, row, weight))
+        loads[v_row] += weight
+    return parts, loads
+
+
+@pytest.mark.parametrize("strategy", ["first_fit", "best_fit"])
+@pytest.mark.parametrize("seed", range(100))
+def test_matches_brute_force(strategy, seed):
+    rnd = random.Random(seed)
+    company = TransportCompany("fit")
+    for i in range(rnd.randint(1, 10)):
+        capacity = rnd.choice(CAPACITIES)
+        company.add_vehicle(Truck(capacity, "r") if i % 2 else Train(capacity, 2))
+    for i in range(rnd.randint(1, 40)):
+        company.add_client(Client(f"c{i}", rnd.choice(WEIGHTS), rnd.random() < 0.3))
+
+    result = company.optimize_cargo_distribution(strategy=strategy)
+    clients, vehicles = company.clients, company.vehicles
+    parts, loads = _reference(list(clients.weights), list(clients.vip),
+                              list(vehicles.capacities), strategy == "best_fit")
+
+    table = company.allocation
+    assert list(zip(table.vehicle_rows, table.client_rows, table.weights)) == parts
+    assert list(vehicles.loads) == loads
+    placed = {row for _, row, _ in parts}
+    expected_short = sum(w for row, w in enumerate(clients.weights) if w > 0 and row not in placed)
+    assert result.unallocated == pytest.approx(expected_short)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from transport.client import Client
+from transport.transportcompany import TransportCompany
+from transport.vehicle import Train, Truck
+
+# Дроби вроде 0.1 и 1/3 не представимы точно — на них накопленные суммы
+# numpy расходятся с последовательным сложением Python
+WEIGHTS = [0, 0.05, 0.1, 0.2, 0.3, 0.7, 1, 1.3, 2.5, 7, 15, 33, 1 / 3]
+CAPACITIES = [0, 0.1, 0.3, 0.7, 5, 10, 12.5, 20, 40, 2 / 3]
+# Части меньше этого веса — шум округления
+NOISE = 1e-9
+
+
+def _distribute(seed, engine):
+    rnd = random.Random(seed)
+    company = TransportCompany("vec")
+    for i in range(rnd.randint(0, 15)):
+        capacity = rnd.choice(CAPACITIES)
+        company.add_vehicle(Truck(capacity, "r") if i % 2 else Train(capacity, 2))
+    for i in range(rnd.randint(0, 60)):
+        company.add_client(Client(f"c{i}", rnd.choice(WEIGHTS), rnd.random() < 0.3))
+    result = company.optimize_cargo_distribution(engine=engine)
+    table = company.allocation
+    parts = list(zip(table.vehicle_rows, table.client_rows, table.weights))
+    shortfalls = [(row, amount) for row, amount in zip(result.short_rows, result.short_amounts)
+                  if amount > NOISE]
+    return parts, list(company.vehicles.loads), shortfalls
+
+
+@pytest.mark.parametrize("seed", range(500))
+def test_numpy_matches_python(seed):
+    parts, loads, shortfalls = _distribute(seed, "numpy")
+    expected_parts, expected_loads, expected_shortfalls = _distribute(seed, "python")
+
+    # Python иногда сам дописывает части в 1e-16 т, numpy — никогда
+    assert all(amount > NOISE for _, _, amount in parts)
+    expected_parts = [part for part in expected_parts if part[2] > NOISE]
+
+    assert [p[:2] for p in parts] == [p[:2] for p in expected_parts]
+    assert [p[2] for p in parts] == pytest.approx([p[2] for p in expected_parts], abs=NOISE)
+    assert loads == pytest.approx(expected_loads, abs=NOISE)
+    assert [row for row, _ in shortfalls] == [row for row, _ in expected_shortfalls]
+    assert [a for _, a in shortfalls] == pytest.approx([a for _, a in expected_shortfalls], abs=NOISE)
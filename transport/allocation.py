@@ -0,0 +1,173 @@
+from array import array
+
+from .vectorized import shifted_rows
+
+
+class AllocationPart:
+    # Часть груза клиента в транспорте — представление строки AllocationTable.
+    # Поддерживает те же атрибуты, что и Client (name, cargo_weight, is_vip).
+    __slots__ = ("_table", "_pos")
+
+    def __init__(self, table, pos: int):
+        self._table = table
+        self._pos = pos
+
+    @property
+    def vehicle_row(self):
+        return self._table.vehicle_rows[self._pos]
+
+    @property
+    def client_row(self):
+        return self._table.client_rows[self._pos]
+
+    @property
+    def client(self):
+        return self._table.client_at(self.client_row)
+
+    @property
+    def name(self):
+        row = self.client_row
+        if row < 0:
+            return self.client.name
+        return self._table.clients.names[row]
+
+    @property
+    def is_vip(self):
+        row = self.client_row
+        if row < 0:
+            return self.client.is_vip
+        return bool(self._table.clients.vip[row])
+
+    @property
+    def cargo_weight(self):
+        return self._table.weights[self._pos]
+
+    def __repr__(self):
+        return f"Client(name='{self.name}', cargo_weight={self.cargo_weight}, is_vip={self.is_vip})"
+
+
+class AllocationTable:
+    # Результат распределения одной таблицей строк (транспорт, клиент, вес).
+    # Номера строк ссылаются на VehicleStore и ClientStore компании;
+    # клиенты не из хранилища (ручной load_cargo) лежат в extras
+    # и кодируются отрицательным номером -(i + 1).
+    def __init__(self, clients=None):
+        self.clients = clients
+        self.vehicle_rows = array("q")
+        self.client_rows = array("q")
+        self.weights = array("d")
+        self.extras = []
+
+        # Индексы "транспорт -> позиции строк" и "клиент -> позиции",
+        # строятся лениво при первом обращении
+        self._by_vehicle = None
+        self._by_client = None
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield AllocationPart(self, pos)
+
+    def clear(self):
+        del self.vehicle_rows[:]
+        del self.client_rows[:]
+        del self.weights[:]
+        self.extras = []
+        self._by_vehicle = None
+        self._by_client = None
+
+    def add(self, vehicle_row: int, client_row: int, weight: float):
+        pos = len(self.weights)
+        self.vehicle_rows.append(vehicle_row)
+        self.client_rows.append(client_row)
+        self.weights.append(weight)
+
+        if self._by_vehicle is not None:
+            self._by_vehicle.setdefault(vehicle_row, []).append(pos)
+        if self._by_client is not None:
+            self._by_client.setdefault(client_row, []).append(pos)
+
+    def client_row_for(self, client):
+        # Номер строки клиента в таблице; сторонние объекты попадают в extras
+        if isinstance(client, AllocationPart) and client._table is self:
+            return client.client_row
+        if self.clients is not None and getattr(client, "_store", None) is self.clients:
+            return self.clients.row_of(client)
+        self.extras.append(client)
+        return -len(self.extras)
+
+    def add_client(self, vehicle_row: int, client):
+        self.add(vehicle_row, self.client_row_for(client), client.cargo_weight)
+
+    def extend_from_bytes(self, vehicle_rows: bytes, client_rows: bytes, weights: bytes):
+        # Массовая запись готовых колонок (int64, int64, float64)
+        self.vehicle_rows.frombytes(vehicle_rows)
+        self.client_rows.frombytes(client_rows)
+        self.weights.frombytes(weights)
+        self._by_vehicle = None
+        self._by_client = None
+
+    def truncate(self, pos: int):
+        # Отбрасывает строки начиная с pos; построенные индексы подрезаются
+        # только по отброшенным строкам
+        if pos >= len(self):
+            return
+        for index, rows in ((self._by_vehicle, self.vehicle_rows),
+                            (self._by_client, self.client_rows)):
+            if index is None:
+                continue
+            for t in range(pos, len(self)):
+                positions = index[rows[t]]
+                positions.pop()
+                if not positions:
+                    del index[rows[t]]
+        del self.vehicle_rows[pos:]
+        del self.client_rows[pos:]
+        del self.weights[pos:]
+
+    def shift_rows(self, column: str, removed_row: int):
+        # После удаления строки хранилища номера строк после неё сдвигаются на 1
+        setattr(self, column, shifted_rows(getattr(self, column), removed_row))
+        if column == "vehicle_rows":
+            self._by_vehicle = None
+        else:
+            self._by_client = None
+
+    def remove_vehicle(self, vehicle_row: int):
+        if not self.positions_for_vehicle(vehicle_row):
+            return
+        keep = [pos for pos in range(len(self)) if self.vehicle_rows[pos] != vehicle_row]
+        self.vehicle_rows = array("q", (self.vehicle_rows[p] for p in keep))
+        self.client_rows = array("q", (self.client_rows[p] for p in keep))
+        self.weights = array("d", (self.weights[p] for p in keep))
+        self._by_vehicle = None
+        self._by_client = None
+
+    def client_at(self, client_row: int):
+        if client_row < 0:
+            return self.extras[-client_row - 1]
+        return self.clients[client_row]
+
+    def _index(self, rows):
+        index = {}
+        for pos, row in enumerate(rows):
+            index.setdefault(row, []).append(pos)
+        return index
+
+    def positions_for_vehicle(self, vehicle_row: int):
+        if self._by_vehicle is None:
+            self._by_vehicle = self._index(self.vehicle_rows)
+        return self._by_vehicle.get(vehicle_row, [])
+
+    def positions_for_client(self, client_row: int):
+        if self._by_client is None:
+            self._by_client = self._index(self.client_rows)
+        return self._by_client.get(client_row, [])
+
+    def parts_for_vehicle(self, vehicle_row: int):
+        return [AllocationPart(self, pos) for pos in self.positions_for_vehicle(vehicle_row)]
+
+    def parts_for_client(self, client_row: int):
+        return [AllocationPart(self, pos) for pos in self.positions_for_client(client_row)]
@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+import sys
+import time
+from array import array
+
+from .client import Client
+from .export import iter_allocation, open_text, record_format, write_records
+from .transportcompany import TransportCompany
+from .vehicle import Truck, Train, Vehicle
+
+TRUE_VALUES = {"1", "true", "yes", "y", "да", "д"}
+# Клиентов в одной пачке extend_columns
+CHUNK = 65536
+
+
+def read_records(path: str):
+    # Построчно читает CSV (с заголовком) или JSONL, в том числе сжатые .gz/.bz2/.xz;
+    # файл целиком в память не попадает. JSON-массив (.json) разбирается целиком
+    with open_text(path, "r") as f:
+        fmt = record_format(path)
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "json":
+            yield from json.load(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def iter_clients(records):
+    for r in records:
+        yield Client(name=r["name"], cargo_weight=float(r["cargo_weight"]),
+                     is_vip=_flag(r.get("is_vip", False)))
+
+
+def load_clients(company, records):
+    # Клиенты копятся в колонки и добавляются в хранилище пачками,
+    # без объекта Client и события на каждую запись; возвращает число клиентов
+    names, weights, vip = [], array("d"), array("b")
+    count = 0
+
+    def flush():
+        company.clients.extend_columns({"names": names, "weights": weights, "vip": vip})
+        del names[:], weights[:], vip[:]
+
+    for r in records:
+        names.append(r["name"])
+        weights.append(float(r["cargo_weight"]))
+        vip.append(_flag(r.get("is_vip", False)))
+        count += 1
+        if len(names) >= CHUNK:
+            flush()
+    flush()
+    return count
+
+
+def iter_vehicles(records):
+    for r in records:
+        cls = r.get("class") or r.get("type") or "Vehicle"
+        cap = float(r["capacity"])
+        if cls == "Truck":
+            obj = Truck(capacity=cap, color=r.get("color", ""))
+        elif cls == "Train":
+            obj = Train(capacity=cap, number_of_cars=int(r.get("number_of_cars") or 0))
+        else:
+            obj = Vehicle(capacity=cap)
+        if r.get("vehicle_id"):
+            obj.vehicle_id = r["vehicle_id"]
+        yield obj
+
+
+def _report(stage, count, seconds, log):
+    rate = count / seconds if seconds > 0 else float("inf")
+    print(f"{stage}: {count} за {seconds:.2f} с ({rate:,.0f}/с)", file=log)
+
+
+def run_batch(clients_path: str, vehicles_path: str, output_path: str,
+              strategy: str = "split", engine: str = "python", log=sys.stderr,
+              stats: bool = False):
+    company = TransportCompany("Batch", stats=stats)
+
+    start = time.perf_counter()
+    count = 0
+    for vehicle in iter_vehicles(read_records(vehicles_path)):
+        company.add_vehicle(vehicle)
+        count += 1
+    _report("Транспорт загружен", count, time.perf_counter() - start, log)
+
+    start = time.perf_counter()
+    count = load_clients(company, read_records(clients_path))
+    _report("Клиенты загружены", count, time.perf_counter() - start, log)
+
+    start = time.perf_counter()
+    result = company.optimize_cargo_distribution(engine=engine, strategy=strategy)
+    _report("Распределение (клиентов)", len(company.clients), time.perf_counter() - start, log)
+
+    start = time.perf_counter()
+    with company.stats.phase("export"):
+        rows = write_records(output_path, iter_allocation(company))
+    if stats:
+        company.stats.count("bytes_written", os.path.getsize(output_path))
+    _report("Результат записан (строк)", rows, time.perf_counter() - start, log)
+
+    print(f"Не распределено: {result.unallocated:.2f} т "
+          f"({result.unallocated_clients} клиентов), заполнение спроса {result.fill_ratio:.1%}, "
+          f"утилизация {result.utilization:.1%}", file=log)
+    if stats:
+        print(f"Статистика: {company.stats.summary()}", file=log)
+    return company
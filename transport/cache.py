@@ -0,0 +1,116 @@
+import hashlib
+import zlib
+from array import array
+from collections import OrderedDict
+
+_MASK64 = (1 << 64) - 1
+
+
+def _text_hash(value):
+    # hash(str) зависит от PYTHONHASHSEED, а hash(None) в 3.11 — от адреса
+    # объекта; строки хешируются по байтам (crc32 и adler32 — 64 бита),
+    # отсутствующее значение — нулём. Хеши чисел и кортежей из чисел
+    # в CPython детерминированы, поэтому хеш строки одинаков в любом процессе.
+    if value is None:
+        return 0
+    data = value.encode("utf-8")
+    return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+
+class StoreFingerprint:
+    # Отпечаток содержимого хранилища. Для каждой строки держится 64-битный
+    # хеш её полей, одинаковый в любом процессе (массив выровнен со строками),
+    # и он обновляется по событиям: правка — пересчёт одной строки, удаление —
+    # сдвиг массива. Строки, добавленные массово, хешируются при следующем
+    # запросе digest(), а сам отпечаток (blake2b по массиву хешей) кешируется
+    # до изменения.
+    def __init__(self, store, row_hashes):
+        self.store = store
+        # row_hashes(first, last) -> хеши строк [first, last)
+        self.row_hashes = row_hashes
+        self.hashes = array("Q")
+        self._digest = None
+        store.listeners.append(self._on_event)
+
+    def _on_event(self, event, row):
+        if event == "load":
+            # загрузка транспорта — не содержимое хранилища
+            return
+        self._digest = None
+        hashed = len(self.hashes)
+        if event == "update" and row < hashed:
+            self.hashes[row] = self.row_hashes(row, row + 1)[0]
+        elif event == "delete" and row < hashed:
+            del self.hashes[row]
+        elif event == "clear":
+            del self.hashes[:]
+
+    def digest(self):
+        if self._digest is None:
+            n = len(self.store)
+            if len(self.hashes) < n:
+                self.hashes.extend(self.row_hashes(len(self.hashes), n))
+            self._digest = hashlib.blake2b(self.hashes.tobytes(), digest_size=16).digest()
+        return self._digest
+
+
+def client_row_hashes(clients):
+    def row_hashes(first, last):
+        rows = zip(map(_text_hash, clients.names[first:last]),
+                   clients.weights[first:last], clients.vip[first:last])
+        return array("Q", [hash(row) & _MASK64 for row in rows])
+    return row_hashes
+
+
+def vehicle_row_hashes(vehicles):
+    def row_hashes(first, last):
+        custom = vehicles.custom_ids
+        rows = zip(vehicles.kinds[first:last], vehicles.capacities[first:last],
+                   vehicles.id_hi[first:last], vehicles.id_lo[first:last],
+                   map(_text_hash, vehicles.colors[first:last]), vehicles.cars[first:last],
+                   map(_text_hash, map(custom.get, range(first, last))))
+        return array("Q", [hash(row) & _MASK64 for row in rows])
+    return row_hashes
+
+
+class ResultCache:
+    # LRU-кеш результатов распределения: ключ — (отпечаток, движок, стратегия),
+    # значение — колонки таблицы распределения, загрузка, порядок транспорта
+    # и недогруженные клиенты. Вытесняются давно не использованные записи,
+    # пока их больше max_entries или суммарный размер больше max_bytes.
+    def __init__(self, max_entries: int = 8, max_bytes: int = 64 * 2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry: dict):
+        nbytes = self._nbytes(entry)
+        if self.max_entries <= 0 or nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= self._nbytes(self.entries.pop(key))
+        self.entries[key] = entry
+        self.size += nbytes
+        self.evict()
+
+    def evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.size -= self._nbytes(entry)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def _nbytes(self, entry):
+        return sum(len(value) for value in entry.values())
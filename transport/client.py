@@ -1,8 +1,22 @@
+from .columns import column_property
+
+
 class Client:
+    # Клиент — лёгкое представление строки ClientStore.
+    # До добавления в компанию значения хранятся в самом объекте.
+    __slots__ = ("_store", "_row", "_id", "_name", "_cargo_weight", "_is_vip")
+
     def __init__(self, name: str, cargo_weight: float, is_vip: bool = False):
-        self.name = name
-        self.cargo_weight = cargo_weight
-        self.is_vip = is_vip
+        self._store = None
+        self._row = -1
+        self._id = -1
+        self._name = name
+        self._cargo_weight = cargo_weight
+        self._is_vip = is_vip
+
+    name = column_property("name", "names")
+    cargo_weight = column_property("cargo_weight", "weights")
+    is_vip = column_property("is_vip", "vip", bool)
 
     def __repr__(self):
-        return f"Client(name='{self.name}', cargo_weight={self.cargo_weight}, is_vip={self.is_vip})"
\ No newline at end of file
+        return f"Client(name='{self.name}', cargo_weight={self.cargo_weight}, is_vip={self.is_vip})"
@@ -0,0 +1,20 @@
+def column_property(field: str, column: str, convert=None):
+    # Свойство объекта-представления: пока объект не привязан к хранилищу,
+    # значение лежит в собственном слоте "_<field>", после привязки —
+    # в колонке хранилища в строке записи self._id (store.row_of).
+    private = "_" + field
+
+    def getter(self):
+        store = self._store
+        if store is None:
+            return getattr(self, private)
+        value = getattr(store, column)[store.row_of(self)]
+        return convert(value) if convert else value
+
+    def setter(self, value):
+        if self._store is None:
+            setattr(self, private, value)
+        else:
+            self._store.set_value(column, self._store.row_of(self), value)
+
+    return property(getter, setter)
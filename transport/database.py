@@ -0,0 +1,283 @@
+import sqlite3
+import uuid
+from array import array
+
+from .store import VEHICLE_KINDS
+
+# Состояние компании в SQLite (.sqlite, .db): клиенты, транспорт и таблица
+# распределения. Запись идёт пачками через executemany в одной транзакции,
+# индексы строятся после вставки. Чтение для таблиц GUI — постранично
+# (PagedQuery): фильтр и сортировка выполняются в базе, в памяти держатся
+# только недавно показанные страницы.
+DATABASE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    row INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    cargo_weight REAL NOT NULL,
+    is_vip INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vehicles (
+    row INTEGER PRIMARY KEY,
+    kind INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    vehicle_id TEXT NOT NULL,
+    uuid BLOB,
+    capacity REAL NOT NULL,
+    current_load REAL NOT NULL,
+    color TEXT,
+    number_of_cars INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS allocations (
+    pos INTEGER PRIMARY KEY,
+    vehicle_row INTEGER NOT NULL,
+    client_row INTEGER NOT NULL,
+    weight REAL NOT NULL
+);
+"""
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS clients_name ON clients(name)",
+    "CREATE INDEX IF NOT EXISTS clients_weight ON clients(cargo_weight)",
+    # по убыванию: порядок (VIP первыми, row) читается индексом в обе стороны
+    "CREATE INDEX IF NOT EXISTS clients_vip ON clients(is_vip DESC)",
+    "CREATE INDEX IF NOT EXISTS vehicles_vehicle_id ON vehicles(vehicle_id)",
+    "CREATE INDEX IF NOT EXISTS vehicles_capacity ON vehicles(capacity)",
+    "CREATE INDEX IF NOT EXISTS vehicles_load ON vehicles(current_load)",
+    "CREATE INDEX IF NOT EXISTS allocations_vehicle ON allocations(vehicle_row)",
+    "CREATE INDEX IF NOT EXISTS allocations_client ON allocations(client_row)",
+)
+INDEX_NAMES = [sql.split()[5] for sql in INDEXES]
+
+# Колонки сортировки: ключ модели -> выражение SQL (как в SortIndex компании)
+CLIENT_ORDER = {"name": "name", "cargo_weight": "cargo_weight", "is_vip": "is_vip DESC"}
+VEHICLE_ORDER = {
+    "vehicle_id": "vehicle_id", "type": "type", "capacity": "capacity",
+    "current_load": "current_load", "clients_count": "clients_count",
+}
+
+CLIENT_COLUMNS = "row, name, cargo_weight, is_vip"
+VEHICLE_COLUMNS = ("row, vehicle_id, type, capacity, current_load, "
+                   "(SELECT COUNT(*) FROM allocations a WHERE a.vehicle_row = vehicles.row) AS clients_count")
+
+PAGE_SIZE = 256
+# Сколько страниц держит PagedQuery
+CACHED_PAGES = 8
+# Пачка строк при загрузке в память
+CHUNK = 65536
+
+
+def _order_clause(orders, column, descending):
+    if column is None:
+        return "ORDER BY row"
+    expr = orders[column]
+    if not descending:
+        # row — для устойчивого порядка равных значений
+        return f"ORDER BY {expr}, row"
+    # По убыванию — обратный порядок целиком, как у SortIndex
+    expr = expr[:-5] if expr.endswith(" DESC") else expr + " DESC"
+    return f"ORDER BY {expr}, row DESC"
+
+
+class PagedQuery:
+    # Ленивая последовательность строк результата запроса: элемент — кортеж
+    # колонок; строки читаются страницами по PAGE_SIZE. Подходит как rows
+    # для VirtualTable. Без фильтра страницы берутся через LIMIT/OFFSET по
+    # индексу сортировки. С фильтром каждая страница заново сканировала бы
+    # таблицу, поэтому номера подходящих строк в нужном порядке читаются
+    # один раз (8 байт на строку), а страницы — по этим номерам.
+    def __init__(self, connection, table: str, columns: str, where: str = "", params=(),
+                 order: str = "ORDER BY row", materialize: bool = False):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.params = tuple(params)
+        self.order = order
+        self._rows = None
+        self._len = None
+        self._pages = {}
+        if materialize:
+            self._rows = array("q", (record[0] for record in connection.execute(
+                f"SELECT {columns} FROM {table} {where} {order}", self.params)))
+
+    def __len__(self):
+        if self._len is None:
+            if self._rows is not None:
+                self._len = len(self._rows)
+            else:
+                sql = f"SELECT COUNT(*) FROM {self.table} {self.where}"
+                self._len = self.connection.execute(sql, self.params).fetchone()[0]
+        return self._len
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("Индекс вне диапазона")
+        number, offset = divmod(idx, PAGE_SIZE)
+        page = self._pages.get(number)
+        if page is None:
+            page = self._fetch(number)
+        return page[offset]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _fetch(self, number):
+        first = number * PAGE_SIZE
+        if self._rows is None:
+            sql = f"SELECT {self.columns} FROM {self.table} {self.where} {self.order} LIMIT ? OFFSET ?"
+            page = self.connection.execute(sql, self.params + (PAGE_SIZE, first)).fetchall()
+        else:
+            rows = self._rows[first:first + PAGE_SIZE]
+            sql = (f"SELECT {self.columns} FROM {self.table} "
+                   f"WHERE row IN ({', '.join('?' * len(rows))})")
+            found = {record[0]: record for record in self.connection.execute(sql, tuple(rows))}
+            page = [found[row] for row in rows]
+        if len(self._pages) >= CACHED_PAGES:
+            # вытесняется самая старая из прочитанных страниц
+            del self._pages[next(iter(self._pages))]
+        self._pages[number] = page
+        return page
+
+
+class CompanyDatabase:
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def save(self, company):
+        # Полностью заменяет содержимое базы состоянием компании
+        clients, vehicles = company.clients, company.vehicles
+        allocation = vehicles.allocation
+        db = self.connection
+        with db:
+            # Индексы на время массовой вставки снимаются: строить их заново быстрее
+            for name in INDEX_NAMES:
+                db.execute(f"DROP INDEX IF EXISTS {name}")
+            db.execute("DELETE FROM clients")
+            db.execute("DELETE FROM vehicles")
+            db.execute("DELETE FROM allocations")
+
+            names = clients.names
+            db.executemany(
+                "INSERT INTO clients VALUES (?, ?, ?, ?, ?)",
+                zip(range(len(clients)), names, map(str.lower, names), clients.weights, clients.vip))
+            db.executemany(
+                "INSERT INTO vehicles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._vehicle_row(vehicles, row) for row in range(len(vehicles))))
+            # Сторонние клиенты (отрицательные номера) в базу не попадают
+            db.executemany(
+                "INSERT INTO allocations VALUES (?, ?, ?, ?)",
+                ((pos, v, c, w) for pos, (v, c, w) in enumerate(
+                    zip(allocation.vehicle_rows, allocation.client_rows, allocation.weights))
+                 if c >= 0))
+
+            for sql in INDEXES:
+                db.execute(sql)
+
+    def _vehicle_row(self, vehicles, row):
+        kind = vehicles.kinds[row]
+        custom = row in vehicles.custom_ids
+        number = (vehicles.id_hi[row] << 64) | vehicles.id_lo[row]
+        return (row, kind, VEHICLE_KINDS[kind].__name__, vehicles.get_vehicle_id(row),
+                None if custom else number.to_bytes(16, "big"),
+                vehicles.capacities[row], vehicles.loads[row],
+                vehicles.colors[row], vehicles.cars[row])
+
+    def load(self, company):
+        # Загружает клиентов, транспорт и распределение в хранилища компании
+        db = self.connection
+
+        cursor = db.execute("SELECT name, cargo_weight, is_vip FROM clients ORDER BY row")
+        while True:
+            chunk = cursor.fetchmany(CHUNK)
+            if not chunk:
+                break
+            names, weights, vip = zip(*chunk)
+            company.clients.extend_columns({"names": names, "weights": array("d", weights),
+                                            "vip": array("b", vip)})
+
+        cursor = db.execute("SELECT kind, vehicle_id, uuid, capacity, current_load, color, "
+                            "number_of_cars FROM vehicles ORDER BY row")
+        while True:
+            chunk = cursor.fetchmany(CHUNK)
+            if not chunk:
+                break
+            columns = {
+                "kinds": array("b"), "capacities": array("d"), "loads": array("d"),
+                "id_hi": array("Q"), "id_lo": array("Q"),
+                "colors": [], "cars": array("q"), "custom_ids": {},
+            }
+            for i, (kind, vehicle_id, blob, capacity, load, color, cars) in enumerate(chunk):
+                number = uuid.UUID(bytes=blob).int if blob is not None else 0
+                if blob is None:
+                    columns["custom_ids"][i] = vehicle_id
+                columns["kinds"].append(kind)
+                columns["capacities"].append(capacity)
+                columns["loads"].append(load)
+                columns["id_hi"].append(number >> 64)
+                columns["id_lo"].append(number & ((1 << 64) - 1))
+                columns["colors"].append(color)
+                columns["cars"].append(cars)
+            company.vehicles.extend_columns(columns)
+
+        vehicle_rows, client_rows, weights = array("q"), array("q"), array("d")
+        for v, c, w in db.execute("SELECT vehicle_row, client_row, weight FROM allocations ORDER BY pos"):
+            vehicle_rows.append(v)
+            client_rows.append(c)
+            weights.append(w)
+        company.vehicles.allocation.extend_from_bytes(
+            vehicle_rows.tobytes(), client_rows.tobytes(), weights.tobytes())
+
+    def clients(self, query: str = "", column: str = None, descending: bool = False,
+                vip: bool = None):
+        # Клиенты (row, name, cargo_weight, is_vip): подстрока имени без учёта
+        # регистра, необязательный отбор по VIP, сортировка по ключу модели
+        conditions, params = [], []
+        query = query.strip().lower()
+        if query:
+            conditions.append("instr(name_lower, ?) > 0")
+            params.append(query)
+        if vip is not None:
+            conditions.append("is_vip = ?")
+            params.append(int(vip))
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        # Подстроку индекс не найдёт, а обход индекса сортировки с проверкой
+        # каждой строки в разы медленнее полного прохода с сортировкой
+        table = "clients NOT INDEXED" if query else "clients"
+        return PagedQuery(self.connection, table, CLIENT_COLUMNS, where, params,
+                          _order_clause(CLIENT_ORDER, column, descending),
+                          materialize=bool(conditions))
+
+    def vehicles(self, column: str = None, descending: bool = False):
+        # Транспорт (row, vehicle_id, type, capacity, current_load, clients_count)
+        # Число клиентов не индексируется: сортировка по нему считается один раз
+        return PagedQuery(self.connection, "vehicles", VEHICLE_COLUMNS,
+                          order=_order_clause(VEHICLE_ORDER, column, descending),
+                          materialize=column == "clients_count")
+
+    def parts_for_vehicle(self, vehicle_row: int):
+        # Грузы транспорта: (имя клиента, вес части, VIP)
+        return self.connection.execute(
+            "SELECT c.name, a.weight, c.is_vip FROM allocations a "
+            "JOIN clients c ON c.row = a.client_row WHERE a.vehicle_row = ? ORDER BY a.pos",
+            (vehicle_row,)).fetchall()
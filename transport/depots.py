@@ -0,0 +1,141 @@
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .client import Client
+from .scenarios import company_from_state, company_state
+from .strategies import MaxSegmentTree
+from .transportcompany import TransportCompany
+
+
+def shard_company(company: TransportCompany, shards: int):
+    # Делит клиентов и транспорт компании по кругу на shards складов
+    clients = company.clients.export_columns()
+    vehicles = company.vehicles.export_columns()
+    custom_ids = vehicles.pop("custom_ids")
+
+    depots = []
+    for i in range(shards):
+        depot = TransportCompany(f"{company.name} #{i + 1}")
+        depot.clients.load_columns({name: col[i::shards] for name, col in clients.items()})
+        shard_vehicles = {name: col[i::shards] for name, col in vehicles.items()}
+        shard_vehicles["custom_ids"] = {
+            row // shards: value for row, value in custom_ids.items() if row % shards == i
+        }
+        depot.vehicles.load_columns(shard_vehicles)
+        depots.append(depot)
+    return depots
+
+
+def _distribute_shard(args):
+    state, strategy = args
+    company = company_from_state(state)
+    company.optimize_cargo_distribution(strategy=strategy)
+    table = company.allocation
+    return (table.vehicle_rows.tobytes(), table.client_rows.tobytes(),
+            table.weights.tobytes(), company.vehicles.loads.tobytes())
+
+
+class DepotNetwork:
+    # Несколько складов (TransportCompany на каждый) с соседством между ними.
+    # Распределение внутри складов идёт параллельно в отдельных процессах,
+    # затем остатки, не поместившиеся на складе, раздаются соседям.
+    def __init__(self, depots, neighbors=None):
+        self.depots = list(depots)
+        if neighbors is None:
+            # По умолчанию склады стоят цепочкой: соседи — предыдущий и следующий
+            n = len(self.depots)
+            neighbors = {i: [j for j in (i - 1, i + 1) if 0 <= j < n] for i in range(n)}
+        self.neighbors = neighbors
+
+    def distribute(self, strategy: str = "split", max_workers=None):
+        tasks = [(company_state(depot), strategy) for depot in self.depots]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_distribute_shard, tasks))
+
+        for depot, (vehicle_rows, client_rows, weights, loads) in zip(self.depots, results):
+            depot.allocation.clear()
+            depot.allocation.extend_from_bytes(vehicle_rows, client_rows, weights)
+            depot.vehicles.loads[:] = array("d", loads)
+
+        # Остатки считаем до раздачи: чужие грузы не должны попасть в расчёт
+        overflow = [self._overflow(depot) for depot in self.depots]
+        rebalanced = 0.0
+        for i, items in enumerate(overflow):
+            for neighbor in self.neighbors.get(i, []):
+                if not items:
+                    break
+                moved, items = self._place_overflow(self.depots[neighbor], items, strategy)
+                rebalanced += moved
+            overflow[i] = items
+
+        return {
+            "depots": len(self.depots),
+            "rebalanced": rebalanced,
+            "unallocated": sum((remaining for items in overflow for _, _, remaining in items), 0.0),
+        }
+
+    @staticmethod
+    def _overflow(depot):
+        # (имя, VIP, остаток) клиентов склада в порядке распределения
+        clients = depot.clients
+        allocated = {}
+        for row, weight in zip(depot.allocation.client_rows, depot.allocation.weights):
+            allocated[row] = allocated.get(row, 0.0) + weight
+
+        order = sorted(range(len(clients)),
+                       key=lambda r: (not clients.vip[r], -clients.weights[r]))
+        items = []
+        for row in order:
+            remaining = clients.weights[row] - allocated.get(row, 0.0)
+            if remaining > 1e-9:
+                items.append((clients.names[row], bool(clients.vip[row]), remaining))
+        return items
+
+    @staticmethod
+    def _place_overflow(depot, items, strategy):
+        # Остатки грузятся в транспорт соседа в порядке убывания свободного
+        # места, как в основных движках: части пишутся прямо в таблицу
+        # распределения, клиент чужого склада заводится в ней один раз (extras)
+        vehicles, table = depot.vehicles, depot.allocation
+        capacities, loads = vehicles.capacities, vehicles.loads
+        order = sorted(range(len(vehicles)), key=lambda r: -(capacities[r] - loads[r]))
+
+        moved = 0.0
+        left = []
+        if strategy == "split":
+            # Заполненный транспорт уходит из головы очереди навсегда
+            free_index = deque(pos for pos, row in enumerate(order)
+                               if capacities[row] - loads[row] > 0)
+            for name, is_vip, remaining in items:
+                client_row = None
+                while remaining > 0 and free_index:
+                    row = order[free_index[0]]
+                    free_space = capacities[row] - loads[row]
+                    to_load = min(remaining, free_space)
+                    if client_row is None:
+                        client_row = table.client_row_for(Client(name, remaining, is_vip))
+                    table.add(row, client_row, to_load)
+                    loads[row] += to_load
+                    remaining -= to_load
+                    moved += to_load
+                    # при to_load == free_space транспорт заполнен, даже если
+                    # сумма с плавающей точкой оставила крошечный остаток
+                    if to_load == free_space or capacities[row] - loads[row] <= 0:
+                        free_index.popleft()
+                if remaining > 0:
+                    left.append((name, is_vip, remaining))
+        else:
+            # Груз целиком в первый по порядку транспорт, где хватает места
+            tree = MaxSegmentTree([capacities[row] - loads[row] for row in order])
+            for name, is_vip, remaining in items:
+                pos = tree.find_first(remaining)
+                if pos is None:
+                    left.append((name, is_vip, remaining))
+                    continue
+                row = order[pos]
+                table.add(row, table.client_row_for(Client(name, remaining, is_vip)), remaining)
+                loads[row] += remaining
+                moved += remaining
+                tree.update(pos, capacities[row] - loads[row])
+        return moved, left
@@ -0,0 +1,124 @@
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+
+# Сжатие выбирается по последнему расширению файла (только стандартная библиотека)
+COMPRESSORS = {
+    ".gz": gzip.open,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+}
+
+
+def _split_compression(path: str):
+    lower = path.lower()
+    for ext, opener in COMPRESSORS.items():
+        if lower.endswith(ext):
+            return lower[:-len(ext)], opener
+    return lower, None
+
+
+def record_format(path: str):
+    # "csv", "json" или "ndjson" по расширению без учёта сжатия
+    base, _ = _split_compression(path)
+    if base.endswith(".csv"):
+        return "csv"
+    if base.endswith(".json"):
+        return "json"
+    return "ndjson"
+
+
+def open_text(path: str, mode: str = "w"):
+    _, opener = _split_compression(path)
+    if opener is None:
+        return open(path, mode, encoding="utf-8", newline="")
+    return opener(path, mode + "t", encoding="utf-8", newline="")
+
+
+def iter_allocation(company):
+    # Строки результата прямо из таблицы распределения, без промежуточных списков
+    vehicles, clients, table = company.vehicles, company.clients, company.allocation
+    last_row, vehicle_id, kind = None, None, None
+    for pos in range(len(table)):
+        v_row = table.vehicle_rows[pos]
+        if v_row != last_row:
+            # строки одного транспорта идут подряд — ID форматируем один раз
+            last_row = v_row
+            vehicle_id = vehicles.get_vehicle_id(v_row)
+            kind = vehicles[v_row].__class__.__name__
+        c_row = table.client_rows[pos]
+        client = table.client_at(c_row) if c_row < 0 else None
+        yield {
+            "vehicle_id": vehicle_id,
+            "type": kind,
+            "client": client.name if client else clients.names[c_row],
+            "cargo_weight": table.weights[pos],
+            "is_vip": client.is_vip if client else bool(clients.vip[c_row]),
+        }
+
+
+def write_records(path: str, records):
+    # Пишет поток словарей в CSV, JSON-массив (.json) или NDJSON
+    # (по расширению, можно со сжатием), возвращает число строк
+    fmt = record_format(path)
+    count = 0
+    with open_text(path) as f:
+        if fmt == "csv":
+            writer = None
+            for r in records:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(r))
+                    writer.writeheader()
+                writer.writerow(r)
+                count += 1
+        elif fmt == "json":
+            # Массив пишется по одной записи, как и NDJSON
+            f.write("[")
+            for r in records:
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(r, ensure_ascii=False))
+                count += 1
+            f.write("\n]\n" if count else "]\n")
+        else:
+            for r in records:
+                f.write(json.dumps(r, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def _write_nested_json(f, vehicles):
+    # Прежний вложенный формат GUI, но записывается по одному транспорту
+    f.write("[")
+    for i, v in enumerate(vehicles):
+        item = {
+            "vehicle_id": v.vehicle_id,
+            "type": v.__class__.__name__,
+            "capacity": v.capacity,
+            "current_load": v.current_load,
+            "clients": [
+                {"name": c.name, "cargo_weight": c.cargo_weight, "is_vip": c.is_vip}
+                for c in v.clients_list
+            ]
+        }
+        f.write(",\n" if i else "\n")
+        f.write(json.dumps(item, ensure_ascii=False))
+    f.write("\n]\n")
+
+
+def export_distribution(company, path: str, vehicles=None):
+    # Потоковый экспорт результата распределения: .csv, .ndjson/.jsonl или .json,
+    # с необязательным сжатием .gz/.bz2/.xz. vehicles задаёт порядок для .json
+    with company.stats.phase("export"):
+        if record_format(path) == "json":
+            with open_text(path) as f:
+                _write_nested_json(f, company.vehicles if vehicles is None else vehicles)
+            rows = len(company.allocation)
+        else:
+            rows = write_records(path, iter_allocation(company))
+    if company.stats.enabled:
+        company.stats.count("bytes_written", os.path.getsize(path))
+    return rows
@@ -0,0 +1,240 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from .stats import Stats
+
+# Как часто (в клиентах) жадный алгоритм сообщает о ходе работы
+PROGRESS_STEP = 1024
+
+
+class GreedyPlan:
+    # Состояние жадного распределения с делением груза, которое можно
+    # чинить по частям. Клиенты упорядочены ключом (не VIP, -вес, id),
+    # транспорт — ключом (-вместимость, id); id растут вместе с номером
+    # строки, поэтому порядок совпадает с устойчивой сортировкой.
+    #
+    # Таблица распределения идёт в порядке клиентов, и транспорт в ней
+    # заполняется последовательно. Изменение клиента на позиции k не влияет
+    # на грузы клиентов до k, поэтому таблица обрезается по началу
+    # клиента k (starts[k]) и жадный алгоритм продолжается с этого места.
+    #
+    # Стоимость починки — цикл Python по частям начиная с k: правка в голове
+    # порядка пересчитывает почти всё. Удаление вдобавок сдвигает номера
+    # строк в оставшейся части таблицы (shifted_rows: с numpy — векторно,
+    # без него — тоже O(частей) на Python), а вставка и удаление ключа в
+    # client_keys/vehicle_keys — сдвиг списка за O(n) на уровне C.
+    def __init__(self, clients, vehicles, stats=None):
+        self.clients = clients
+        self.vehicles = vehicles
+        self.table = vehicles.allocation
+        self.stats = stats if stats is not None else Stats()
+
+        self.client_keys = sorted(self.client_key(row) for row in range(len(clients)))
+        self.vehicle_keys = sorted(self.vehicle_key(row) for row in range(len(vehicles)))
+
+        self.starts = []          # starts[k] — первая строка таблицы клиента k
+        # (позиция клиента, остаток) для клиентов, которым не хватило места;
+        # позиции, а не строки — строки сдвигаются при удалении клиентов
+        self.short = []
+        self.size = len(self.table)
+
+        self._pending = None
+
+    def client_key(self, row):
+        return (not self.clients.vip[row], -self.clients.weights[row], self.clients.ids[row])
+
+    def vehicle_key(self, row):
+        return (-self.vehicles.capacities[row], self.vehicles.ids[row])
+
+    def client_row(self, key):
+        return bisect_left(self.clients.ids, key[2])
+
+    def vehicle_row(self, key):
+        return bisect_left(self.vehicles.ids, key[1])
+
+    def sorted_vehicles(self):
+        return [self.vehicles[self.vehicle_row(key)] for key in self.vehicle_keys]
+
+    def shortfalls(self):
+        # Строки недогруженных клиентов и остатки компактными массивами
+        rows = array("q", [self.client_row(self.client_keys[pos]) for pos, _ in self.short])
+        return rows, array("d", [remaining for _, remaining in self.short])
+
+    def _cut(self, k):
+        # Отбрасывает грузы клиентов начиная с позиции k
+        if k < len(self.starts):
+            self.table.truncate(self.starts[k])
+            del self.starts[k:]
+        del self.short[bisect_left(self.short, (k,)):]
+        self.size = len(self.table)
+
+    def _first_affected_client(self, vehicle_key):
+        # Первый клиент, чьи грузы лежат в транспорте с ключом >= vehicle_key,
+        # либо первый недогруженный клиент — ему может хватить нового места
+        vehicle_rows = self.table.vehicle_rows
+        t = bisect_left(range(len(self.table)), vehicle_key,
+                        key=lambda i: self.vehicle_key(vehicle_rows[i]))
+        k = len(self.starts) if t == len(self.table) else bisect_right(self.starts, t) - 1
+        if self.short:
+            k = min(k, self.short[0][0])
+        return k
+
+    def run(self, k: int = 0, progress=None):
+        # Жадное распределение клиентов с позиции k; таблица к этому моменту
+        # должна заканчиваться началом клиента k.
+        # progress(done, total) вызывается каждые PROGRESS_STEP клиентов
+        # и может прервать работу исключением
+        stats = self.stats
+        first_part = len(self.table)
+        first_short = len(self.short)
+        with stats.phase("fill"):
+            self._fill(k, progress)
+
+        if stats.enabled:
+            # Счётчики считаются по таблице после цикла, чтобы не нагружать его
+            table = self.table
+            parts = len(table) - first_part
+            ends = self.starts[k + 1:] + [len(table)]
+            placed = sum(1 for a, b in zip(self.starts[k:], ends) if b > a)
+            rows = table.vehicle_rows
+            visited = sum(1 for t in range(first_part, len(table))
+                          if t == first_part or rows[t] != rows[t - 1])
+            stats.count("clients", len(self.client_keys) - k)
+            stats.count("parts", parts)
+            stats.count("splits", parts - placed)
+            stats.count("vehicles_visited", visited)
+            stats.count("unallocated_clients", len(self.short) - first_short)
+
+    def _fill(self, k, progress):
+        table = self.table
+        weights = self.clients.weights
+        capacities, loads = self.vehicles.capacities, self.vehicles.loads
+
+        # Транспорт до последнего затронутого заполнен и не меняется
+        if len(table):
+            last = table.vehicle_rows[-1]
+            cursor = bisect_left(self.vehicle_keys, self.vehicle_key(last))
+        else:
+            last = None
+            cursor = 0
+
+        vehicle_rows = [self.vehicle_row(key) for key in self.vehicle_keys[cursor:]]
+        for row in vehicle_rows:
+            loads[row] = 0.0
+
+        if last is not None:
+            # Загрузку пограничного транспорта складываем в том же порядке,
+            # что и при полном пересчёте, чтобы результат совпадал до бита
+            i = len(table)
+            while i > 0 and table.vehicle_rows[i - 1] == last:
+                i -= 1
+            for t in range(i, len(table)):
+                loads[last] += table.weights[t]
+
+        # Индекс транспорта, в котором ещё есть место (позиции в vehicle_rows).
+        # Жадный алгоритм всегда грузит первый незаполненный транспорт,
+        # поэтому заполненный уходит из головы очереди и больше не просматривается.
+        free_index = deque(
+            i for i, row in enumerate(vehicle_rows)
+            if capacities[row] - loads[row] > 0
+        )
+
+        short = self.short
+        add = table.add
+        client_keys = self.client_keys
+        total = len(client_keys)
+        for pos in range(k, total):
+            if progress is not None and not pos % PROGRESS_STEP:
+                progress(pos, total)
+            self.starts.append(len(table))
+            row = self.client_row(client_keys[pos])
+            remaining = weights[row]
+
+            while remaining > 0 and free_index:
+                v_row = vehicle_rows[free_index[0]]
+                free_space = capacities[v_row] - loads[v_row]
+
+                to_load = min(remaining, free_space)
+
+                add(v_row, row, to_load)
+                loads[v_row] += to_load
+                remaining -= to_load
+
+                if capacities[v_row] - loads[v_row] <= 0:
+                    free_index.popleft()
+
+            if remaining > 0:
+                short.append((pos, remaining))
+
+        self.size = len(table)
+        if progress is not None:
+            progress(total, total)
+
+    def on_client_event(self, event, row):
+        # Возвращает False, если план починить нельзя и нужен полный пересчёт
+        if len(self.table) != self.size or event in ("clear", "load"):
+            return False
+
+        if event == "insert":
+            key = self.client_key(row)
+            k = bisect_left(self.client_keys, key)
+            self.client_keys.insert(k, key)
+            self._cut(k)
+            self.run(k)
+
+        elif event in ("before_update", "before_delete"):
+            key = self.client_key(row)
+            k = bisect_left(self.client_keys, key)
+            del self.client_keys[k]
+            self._cut(k)
+            self._pending = k
+
+        elif event == "update":
+            key = self.client_key(row)
+            k = bisect_left(self.client_keys, key)
+            self.client_keys.insert(k, key)
+            k = min(k, self._pending)
+            self._cut(k)
+            self.run(k)
+
+        elif event == "delete":
+            self.table.shift_rows("client_rows", row)
+            self.run(self._pending)
+
+        else:
+            return False
+        return True
+
+    def on_vehicle_event(self, event, row):
+        if len(self.table) != self.size or event in ("clear", "load"):
+            return False
+
+        if event == "insert":
+            key = self.vehicle_key(row)
+            k = self._first_affected_client(key)
+            self.vehicle_keys.insert(bisect_left(self.vehicle_keys, key), key)
+            self._cut(k)
+            self.run(k)
+
+        elif event in ("before_update", "before_delete"):
+            key = self.vehicle_key(row)
+            k = self._first_affected_client(key)
+            del self.vehicle_keys[bisect_left(self.vehicle_keys, key)]
+            self._cut(k)
+            self._pending = k
+
+        elif event == "update":
+            key = self.vehicle_key(row)
+            k = min(self._first_affected_client(key), self._pending)
+            self.vehicle_keys.insert(bisect_left(self.vehicle_keys, key), key)
+            self._cut(k)
+            self.run(k)
+
+        elif event == "delete":
+            self.table.shift_rows("vehicle_rows", row)
+            self.run(self._pending)
+
+        else:
+            return False
+        return True
@@ -0,0 +1,409 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from array import array
+
+from .client import Client
+from .persistence import (_client_record, _vehicle_from_record, _vehicle_record,
+                          read_company, replace_state, save_company)
+from .transportcompany import TransportCompany
+
+# Журнал изменений рядом с файлом состояния (state.tcs -> state.tcs.journal).
+# Каждое добавление, правка и удаление клиента или транспорта дописывается
+# строкой JSON; записи копятся в памяти и сбрасываются на диск с fsync
+# пачками, поэтому сохранение стоит O(изменений), а не O(состояния).
+#
+# Первая строка журнала — заголовок с отпечатком состояния (state_digest:
+# blake2b по байтам колонок, одинаковый в любом процессе), к которому
+# применяются записи. Сжатие переключает запись на новый журнал
+# (.journal.next) с отпечатком текущего состояния, в фоне пишет снимок,
+# затем переименовывает .next в .journal. Восстановление загружает снимок
+# и применяет по очереди журналы, чей отпечаток совпадает с текущим
+# состоянием, так что сбой на любом шаге сжатия ничего не теряет и не
+# применяет записи дважды. Журнал с записями, который не подошёл ни к
+# снимку, ни к цепочке, не затирается, а откладывается в .stale.
+JOURNAL_SUFFIX = ".journal"
+NEXT_SUFFIX = ".next"
+STALE_SUFFIX = ".stale"
+JOURNAL_FORMAT = "transport-journal"
+JOURNAL_VERSION = 1
+
+# Записей в буфере до принудительного сброса на диск
+BATCH_SIZE = 256
+# Сжатие запускается, когда в журнале записей больше, чем строк состояния,
+# но не меньше этого порога. При закрытии журнал сворачивается, только если
+# записей не меньше порога: короткий журнал применяется при загрузке
+# быстрее, чем переписывается снимок.
+COMPACT_MIN_RECORDS = 10000
+
+
+def _fsync_dir(path):
+    # Переименование файла надёжно только после fsync каталога (POSIX)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _column_bytes(column):
+    # Байты числовой колонки (array или memoryview) в порядке little-endian
+    data = column.tobytes()
+    if sys.byteorder == "big":
+        swapped = array(column.typecode if isinstance(column, array) else column.format)
+        swapped.frombytes(data)
+        swapped.byteswap()
+        data = swapped.tobytes()
+    return data
+
+
+def _text_bytes(values):
+    # Длины строк (-1 для None) и сами строки подряд — однозначная запись
+    lengths = array("q", (-1 if value is None else len(value) for value in values))
+    text = "".join(value for value in values if value is not None)
+    return _column_bytes(lengths) + text.encode("utf-8", "surrogatepass")
+
+
+def state_digest(company):
+    # Отпечаток содержимого компании для заголовка журнала. В отличие от
+    # company.fingerprint не зависит от hash() и версии Python: снимок,
+    # записанный одним процессом, узнаётся в любом другом.
+    clients, vehicles = company.clients, company.vehicles
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_text_bytes(clients.names))
+    h.update(_column_bytes(clients.weights))
+    h.update(_column_bytes(clients.vip))
+    for name in ("kinds", "capacities", "id_hi", "id_lo", "cars"):
+        h.update(_column_bytes(getattr(vehicles, name)))
+    h.update(_text_bytes(vehicles.colors))
+    h.update(json.dumps(sorted(vehicles.custom_ids.items())).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _read_journal(path):
+    # (отпечаток базы, записи, длина целой части файла) или None.
+    # Оборванная при сбое последняя строка отбрасывается.
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.readline()
+        try:
+            header = json.loads(header)
+        except ValueError:
+            return None
+        if header.get("format") != JOURNAL_FORMAT:
+            raise ValueError(f"Файл не является журналом изменений: {path}")
+        if header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"Неподдерживаемая версия журнала: {header.get('version')}")
+        records = []
+        good = f.tell()
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+    return header["base"], records, good
+
+
+def _apply(company, record):
+    op, kind = record["op"], record["kind"]
+    store = company.clients if kind == "client" else company.vehicles
+    if op == "delete":
+        store.pop(record["row"])
+        return
+    if op == "clear":
+        store.clear()
+        return
+    if kind == "client":
+        obj = Client(name=record["name"], cargo_weight=float(record["cargo_weight"]),
+                     is_vip=bool(record["is_vip"]))
+    else:
+        obj = _vehicle_from_record(record)
+    if op == "insert":
+        store.append(obj)
+    elif op == "update":
+        store[record["row"]] = obj
+    else:
+        raise ValueError(f"Неизвестная запись журнала: {op}")
+
+
+class Journal:
+    def __init__(self, company, path: str, batch_size: int = BATCH_SIZE):
+        self.company = company
+        # Файл снимка; формат выбирается по расширению, как в save_company
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.next_path = self.journal_path + NEXT_SUFFIX
+        self.batch_size = batch_size
+
+        self.buffer = []
+        # Записей в текущем журнале (для решения о сжатии)
+        self.records = 0
+        self._file = None
+        self._file_path = None
+        # Журналы, применённые при восстановлении, и журналы с записями,
+        # не подошедшие к состоянию
+        self._applied = []
+        self._unmatched = []
+        # Куда attach() отложил неподошедшие журналы
+        self.stale = []
+        self._compaction = None
+        self.compaction_error = None
+
+        self._listeners = (
+            (company.clients, self._listener("client", company.clients, _client_record)),
+            (company.vehicles, self._listener("vehicle", company.vehicles, _vehicle_record)),
+        )
+
+    def _listener(self, kind, store, to_record):
+        def on_event(event, row):
+            if event in ("insert", "update"):
+                record = to_record(store, row)
+                if event == "update":
+                    record["row"] = row
+                self._append(event, kind, record)
+            elif event == "extend":
+                for r in range(row, len(store)):
+                    self._append("insert", kind, to_record(store, r))
+            elif event == "delete":
+                self._append("delete", kind, {"row": row})
+            elif event == "clear":
+                # load_columns/attach_columns сообщают clear уже с новыми строками
+                self._append("clear", kind, {})
+                for r in range(len(store)):
+                    self._append("insert", kind, to_record(store, r))
+            # Записи одного события не разрываются сбросом
+            if len(self.buffer) >= self.batch_size:
+                self.flush()
+        return on_event
+
+    def _append(self, op, kind, record):
+        record["op"] = op
+        record["kind"] = kind
+        self.buffer.append(record)
+
+    def recover(self):
+        # Загружает снимок и применяет журналы; возвращает число записей.
+        # Состояние собирается в отдельной компании и переносится в
+        # self.company только целиком: при ошибке чтения прежнее остаётся
+        company = self.company
+        if os.path.exists(self.path):
+            with company.stats.phase("load"):
+                loaded = read_company(self.path, company.name)
+        else:
+            loaded = TransportCompany(company.name)
+
+        applied = 0
+        matched, unmatched, truncate = [], [], []
+        records_count = self.records
+        with company.stats.phase("journal_replay"):
+            for path in (self.journal_path, self.next_path):
+                journal = _read_journal(path)
+                if journal is None:
+                    continue
+                base, records, good = journal
+                if base != state_digest(loaded):
+                    # журнал старше снимка (сжатие успело записать снимок)
+                    # или не относится к нему; решает attach()
+                    if records:
+                        unmatched.append(path)
+                    continue
+                for record in records:
+                    _apply(loaded, record)
+                applied += len(records)
+                matched.append(path)
+                truncate.append((path, good))
+                records_count = len(records)
+
+        replace_state(company, loaded)
+        # Дальше журнал дописывается, поэтому оборванный хвост отрезается
+        for path, good in truncate:
+            with open(path, "r+b") as f:
+                f.truncate(good)
+        self._applied = matched
+        self._unmatched = unmatched
+        self.records = records_count
+        return applied
+
+    def attach(self):
+        # Начинает запись изменений. После recover() дописывает найденный
+        # журнал, иначе заводит новый от текущего состояния.
+        self._set_aside()
+        if self._applied == [self.journal_path]:
+            self._open(self.journal_path)
+        elif self._applied == [self.next_path]:
+            # сжатие записало снимок, но не успело переименовать журнал
+            os.replace(self.next_path, self.journal_path)
+            _fsync_dir(self.journal_path)
+            self._open(self.journal_path)
+        elif not self._applied:
+            self._start_journal(self.journal_path)
+            if os.path.exists(self.next_path):
+                os.remove(self.next_path)
+            self._open(self.journal_path)
+        else:
+            # Применены оба журнала: снимок отстаёт от первого из них
+            self._rewrite()
+        for store, callback in self._listeners:
+            store.listeners.append(callback)
+
+    def _set_aside(self):
+        # Старый .journal при применённом .next уже вошёл в снимок; любой
+        # другой неподошедший журнал с записями сохраняется рядом
+        self.stale = []
+        for path in self._unmatched:
+            if path == self.journal_path and self.next_path in self._applied:
+                continue
+            stale = path + STALE_SUFFIX
+            os.replace(path, stale)
+            self.stale.append(stale)
+        if self.stale:
+            _fsync_dir(self.journal_path)
+        self._unmatched = []
+
+    def _open(self, path):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(path, "ab")
+        self._file_path = path
+
+    def _start_journal(self, path):
+        header = {"format": JOURNAL_FORMAT, "version": JOURNAL_VERSION,
+                  "base": state_digest(self.company)}
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(path)
+        self.records = 0
+
+    def _replace_snapshot(self, company):
+        # Снимок пишется рядом и подменяет прежний только целиком
+        base, ext = os.path.splitext(self.path)
+        tmp = f"{base}.compact{ext}"
+        save_company(company, tmp)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    def _release_snapshot(self):
+        # Колонки, подключённые к отображённому в память снимку (.tcsnap),
+        # копируются в массивы до его замены: пока отображение открыто,
+        # os.replace поверх файла на Windows не проходит. Другие процессы,
+        # открывшие тот же снимок, держат его по-прежнему — замена снимка
+        # при открытых чужих отображениях работает только на POSIX.
+        for store in (self.company.clients, self.company.vehicles):
+            store._ensure_writable()
+
+    def _rewrite(self):
+        # Синхронно: снимок текущего состояния и пустой журнал от него
+        self._release_snapshot()
+        self._replace_snapshot(self.company)
+        self._start_journal(self.journal_path)
+        if os.path.exists(self.next_path):
+            os.remove(self.next_path)
+        self._open(self.journal_path)
+
+    @property
+    def pending(self):
+        return len(self.buffer)
+
+    def flush(self):
+        # Дописывает накопленные записи и делает один fsync на пачку
+        if not self.buffer or self._file is None:
+            return
+        self._write()
+        rows = len(self.company.clients) + len(self.company.vehicles)
+        if self.records > max(COMPACT_MIN_RECORDS, rows):
+            self.compact()
+
+    def _write(self):
+        stats = self.company.stats
+        with stats.phase("journal_flush"):
+            data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self.buffer)
+            self._file.write(data.encode("utf-8"))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        stats.count("journal_records", len(self.buffer))
+        self.records += len(self.buffer)
+        self.buffer = []
+
+    @property
+    def compacting(self):
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def compact(self, background: bool = True):
+        # Сворачивает журнал в новый снимок. Колонки копируются сразу,
+        # снимок пишется из копии (в фоне при background=True), а новые
+        # изменения тем временем идут в следующий журнал.
+        if self.compacting:
+            return False
+        if self.buffer and self._file is not None:
+            self._write()
+        if self._file_path == self.next_path:
+            # Прошлое сжатие не завершилось: цепочка из двух журналов
+            # сворачивается сразу, третьего файла для неё нет
+            self._rewrite()
+            return True
+
+        # Срез memoryview — не копия: копия компании не должна ссылаться
+        # на отображение заменяемого снимка
+        self._release_snapshot()
+        copy = TransportCompany(self.company.name)
+        copy.clients.load_columns(self.company.clients.export_columns())
+        copy.vehicles.load_columns(self.company.vehicles.export_columns())
+
+        self._start_journal(self.next_path)
+        self._open(self.next_path)
+
+        self.compaction_error = None
+        if background:
+            self._compaction = threading.Thread(target=self._compact_copy, args=(copy,),
+                                                daemon=True)
+            self._compaction.start()
+        else:
+            self._compact_copy(copy)
+            if self.compaction_error is not None:
+                raise self.compaction_error
+        return True
+
+    def _compact_copy(self, copy):
+        try:
+            self._replace_snapshot(copy)
+            # Открытый дескриптор остаётся связан с тем же файлом
+            os.replace(self.next_path, self.journal_path)
+            _fsync_dir(self.journal_path)
+            self._file_path = self.journal_path
+        except Exception as e:
+            self.compaction_error = e
+
+    def wait(self):
+        # Дождаться фонового сжатия
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def close(self):
+        # Длинный журнал сворачивается в снимок, чтобы следующий запуск
+        # не применял его заново; короткий просто остаётся на диске
+        try:
+            self.flush()
+            self.wait()
+            if self._file is not None and self.records >= COMPACT_MIN_RECORDS:
+                self.compact(background=False)
+        finally:
+            for store, callback in self._listeners:
+                if callback in store.listeners:
+                    store.listeners.remove(callback)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
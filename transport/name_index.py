@@ -0,0 +1,117 @@
+from array import array
+from bisect import bisect_left, insort
+
+# Длина n-граммы индекса; более короткие запросы проверяются перебором
+GRAM = 3
+
+
+def _grams(name):
+    return {name[i:i + GRAM] for i in range(len(name) - GRAM + 1)}
+
+
+class NameIndex:
+    # Индекс подстрок имён клиентов по триграммам. Списки вхождений хранят
+    # id строк (они только растут), поэтому удаление строки не сдвигает
+    # остальные списки. Список триграммы строится при первом запросе с ней,
+    # а уже построенные списки поддерживаются по событиям хранилища.
+    def __init__(self, clients):
+        self.clients = clients
+        self.lower = None        # имена в нижнем регистре по номеру строки
+        self.postings = None     # триграмма -> array('q') id строк
+
+        # Последний запрос и его результат для сужения при дописывании;
+        # любое изменение хранилища его сбрасывает
+        self._last_query = None
+        self._last_rows = None
+
+        clients.listeners.append(self._on_event)
+
+    def _build(self):
+        self.lower = [name.lower() for name in self.clients.names]
+        self.postings = {}
+
+    def _posting(self, gram):
+        posting = self.postings.get(gram)
+        if posting is None:
+            ids = self.clients.ids
+            posting = self.postings[gram] = array(
+                "q", [ids[row] for row, name in enumerate(self.lower) if gram in name])
+        return posting
+
+    def _add_rows(self, first):
+        postings = self.postings
+        ids = self.clients.ids
+        lower = self.lower
+        for row in range(first, len(lower)):
+            for gram in _grams(lower[row]):
+                if gram in postings:
+                    postings[gram].append(ids[row])
+
+    def _remove_row(self, row):
+        row_id = self.clients.ids[row]
+        for gram in _grams(self.lower[row]):
+            if gram in self.postings:
+                self.postings[gram].remove(row_id)
+
+    def _on_event(self, event, row):
+        self._last_query = None
+        if self.postings is None:
+            return
+        if event == "insert":
+            self.lower.append(self.clients.names[row].lower())
+            self._add_rows(row)
+        elif event == "extend":
+            self.lower.extend(name.lower() for name in self.clients.names[row:])
+            self._add_rows(row)
+        elif event in ("before_update", "before_delete"):
+            self._remove_row(row)
+        elif event == "update":
+            name = self.lower[row] = self.clients.names[row].lower()
+            row_id = self.clients.ids[row]
+            for gram in _grams(name):
+                if gram in self.postings:
+                    insort(self.postings[gram], row_id)
+        elif event == "delete":
+            del self.lower[row]
+        else:
+            # clear, загрузка состояния — индекс перестроится при запросе
+            self.lower = None
+            self.postings = None
+
+    def _rows_for(self, found_ids):
+        ids = self.clients.ids
+        if not found_ids:
+            return []
+        # Без удалений id идут подряд и номер строки вычисляется сдвигом
+        if ids[-1] - ids[0] == len(ids) - 1:
+            base = ids[0]
+            return [row_id - base for row_id in found_ids]
+        return [bisect_left(ids, row_id) for row_id in found_ids]
+
+    def search(self, query: str):
+        # Номера строк клиентов, в имени которых есть query (без учёта регистра),
+        # по возрастанию
+        query = query.lower()
+        if not query:
+            return range(len(self.clients))
+        if self.postings is None:
+            self._build()
+
+        lower = self.lower
+        last = self._last_query
+        if last is not None and last in query:
+            # Запрос дописан: совпадения ищем только среди прошлого результата
+            candidates = self._last_rows
+        elif len(query) >= GRAM:
+            # Достаточно одной триграммы запроса: кандидаты всё равно проверяются
+            # подстрокой. Берём самый короткий из уже построенных списков.
+            built = [self.postings[gram] for gram in _grams(query) if gram in self.postings]
+            posting = min(built, key=len) if built else self._posting(query[:GRAM])
+            candidates = self._rows_for(posting)
+        else:
+            candidates = range(len(lower))
+
+        rows = [row for row in candidates if query in lower[row]]
+        self._last_query = query
+        self._last_rows = rows
+        return rows
@@ -0,0 +1,307 @@
+import json
+import os
+import struct
+from array import array
+
+from .client import Client
+from .database import DATABASE_EXTENSIONS, CompanyDatabase
+from .snapshot import SNAPSHOT_EXTENSION, load_snapshot, write_snapshot
+from .transportcompany import TransportCompany
+from .vehicle import Truck, Train, Vehicle
+
+# Форматы файла состояния выбираются по расширению:
+#   .json            — прежний формат GUI (один JSON-документ);
+#   .ndjson, .jsonl  — потоковый: одна запись на строку;
+#   .tcs             — двоичный: таблица строк и записи фиксированной длины;
+#   .tcsnap          — снимок для mmap: колонки читаются прямо из файла;
+#   .sqlite, .db     — база SQLite, вместе с таблицей распределения.
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+BINARY_EXTENSION = ".tcs"
+
+BINARY_MAGIC = b"TCSTATE\x00"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sHxxQQI")    # magic, версия, клиентов, транспорта, строк
+CLIENT_RECORD = struct.Struct("<Idb")         # имя (номер строки), вес, VIP
+VEHICLE_RECORD = struct.Struct("<bdQQiqi")    # тип, вместимость, uuid, цвет, вагоны, особый ID
+STRING_LENGTH = struct.Struct("<I")
+
+KIND_NAMES = ("Vehicle", "Truck", "Train")
+
+# Записи читаются и пишутся пачками, чтобы память оставалась ограниченной
+CHUNK = 65536
+
+
+def state_format(path: str):
+    lower = path.lower()
+    if lower.endswith(NDJSON_EXTENSIONS):
+        return "ndjson"
+    if lower.endswith(BINARY_EXTENSION):
+        return "binary"
+    if lower.endswith(SNAPSHOT_EXTENSION):
+        return "snapshot"
+    if lower.endswith(DATABASE_EXTENSIONS):
+        return "sqlite"
+    return "json"
+
+
+def save_company(company, path: str):
+    fmt = state_format(path)
+    with company.stats.phase("save"):
+        if fmt == "ndjson":
+            _save_ndjson(company, path)
+        elif fmt == "binary":
+            _save_binary(company, path)
+        elif fmt == "snapshot":
+            write_snapshot(company, path)
+        elif fmt == "sqlite":
+            with CompanyDatabase(path) as db:
+                db.save(company)
+        else:
+            _save_json(company, path)
+    if company.stats.enabled:
+        company.stats.count("bytes_written", os.path.getsize(path))
+
+
+def load_company(company, path: str):
+    # Заменяет клиентов и транспорт компании содержимым файла. Файл читается
+    # в отдельную компанию: при ошибке разбора прежнее состояние остаётся
+    with company.stats.phase("load"):
+        replace_state(company, read_company(path, company.name))
+
+
+def read_company(path: str, name: str = "Loaded"):
+    # Новая компания с содержимым файла
+    company = TransportCompany(name)
+    fmt = state_format(path)
+    if fmt == "ndjson":
+        _load_ndjson(company, path)
+    elif fmt == "binary":
+        _load_binary(company, path)
+    elif fmt == "snapshot":
+        load_snapshot(company, path)
+    elif fmt == "sqlite":
+        # sqlite3.connect молча создал бы пустую базу
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        with CompanyDatabase(path) as db:
+            db.load(company)
+    else:
+        _load_json(company, path)
+    return company
+
+
+def replace_state(company, source):
+    # Переносит колонки, загрузку и распределение source в company.
+    # Колонки снимка (memoryview) подключаются без копирования, остальные
+    # копирует load_columns; подписчики company получают по событию clear.
+    for target, store in ((company.clients, source.clients), (company.vehicles, source.vehicles)):
+        columns = {name: getattr(store, name) for name in store.state_columns}
+        if store is source.vehicles:
+            columns["custom_ids"] = store.custom_ids
+        if store._external:
+            target.attach_columns(columns)
+        else:
+            target.load_columns(columns)
+
+    # Загрузка и распределение (есть только в SQLite) — после событий clear,
+    # которые их сбрасывают
+    table = source.allocation
+    if len(table):
+        company.vehicles.loads = array("d", source.vehicles.loads)
+        company.allocation.extend_from_bytes(
+            table.vehicle_rows.tobytes(), table.client_rows.tobytes(), table.weights.tobytes())
+
+
+def _vehicle_record(vehicles, row):
+    kind = vehicles.kinds[row]
+    vdata = {
+        "class": KIND_NAMES[kind],
+        "vehicle_id": vehicles.get_vehicle_id(row),
+        "capacity": vehicles.capacities[row],
+    }
+    if kind == 1:
+        vdata["color"] = vehicles.colors[row]
+    if kind == 2:
+        vdata["number_of_cars"] = vehicles.cars[row]
+    return vdata
+
+
+def _client_record(clients, row):
+    return {
+        "name": clients.names[row],
+        "cargo_weight": clients.weights[row],
+        "is_vip": bool(clients.vip[row]),
+    }
+
+
+def _vehicle_from_record(v):
+    cls = v["class"]
+    cap = float(v["capacity"])
+
+    if cls == "Truck":
+        obj = Truck(capacity=cap, color=v.get("color", ""))
+    elif cls == "Train":
+        obj = Train(capacity=cap, number_of_cars=int(v.get("number_of_cars", 0)))
+    else:
+        obj = Vehicle(capacity=cap)
+
+    obj.vehicle_id = v.get("vehicle_id", obj.vehicle_id)
+    return obj
+
+
+def _save_json(company, path):
+    clients, vehicles = company.clients, company.vehicles
+    data = {
+        "clients": [_client_record(clients, row) for row in range(len(clients))],
+        "vehicles": [_vehicle_record(vehicles, row) for row in range(len(vehicles))],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _load_json(company, path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    for c in data.get("clients", []):
+        company.add_client(Client(
+            name=c["name"],
+            cargo_weight=float(c["cargo_weight"]),
+            is_vip=bool(c["is_vip"])
+        ))
+    for v in data.get("vehicles", []):
+        company.add_vehicle(_vehicle_from_record(v))
+
+
+def _save_ndjson(company, path):
+    clients, vehicles = company.clients, company.vehicles
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"format": "transport-state", "version": 1}) + "\n")
+        for row in range(len(clients)):
+            record = _client_record(clients, row)
+            record["kind"] = "client"
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        for row in range(len(vehicles)):
+            record = _vehicle_record(vehicles, row)
+            record["kind"] = "vehicle"
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _load_ndjson(company, path):
+    # Клиенты копятся в колонки и сбрасываются в хранилище пачками
+    names, weights, vip = [], array("d"), array("b")
+
+    def flush():
+        company.clients.extend_columns({"names": names, "weights": weights, "vip": vip})
+        del names[:], weights[:], vip[:]
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            kind = record.get("kind")
+            if kind == "client":
+                names.append(record["name"])
+                weights.append(float(record["cargo_weight"]))
+                vip.append(bool(record["is_vip"]))
+                if len(names) >= CHUNK:
+                    flush()
+            elif kind == "vehicle":
+                company.add_vehicle(_vehicle_from_record(record))
+    flush()
+
+
+def _save_binary(company, path):
+    clients, vehicles = company.clients, company.vehicles
+
+    # Таблица строк: имена клиентов, цвета и особые ID транспорта
+    strings = {}
+    for value in clients.names:
+        strings.setdefault(str(value), len(strings))
+    for value in vehicles.colors:
+        if value is not None:
+            strings.setdefault(str(value), len(strings))
+    for value in vehicles.custom_ids.values():
+        strings.setdefault(str(value), len(strings))
+
+    with open(path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION,
+                                   len(clients), len(vehicles), len(strings)))
+        for value in strings:
+            data = value.encode("utf-8")
+            f.write(STRING_LENGTH.pack(len(data)))
+            f.write(data)
+
+        for start in range(0, len(clients), CHUNK):
+            end = min(start + CHUNK, len(clients))
+            f.write(b"".join(
+                CLIENT_RECORD.pack(strings[str(clients.names[row])], clients.weights[row], clients.vip[row])
+                for row in range(start, end)
+            ))
+
+        for start in range(0, len(vehicles), CHUNK):
+            end = min(start + CHUNK, len(vehicles))
+            chunk = []
+            for row in range(start, end):
+                color = vehicles.colors[row]
+                custom = vehicles.custom_ids.get(row)
+                chunk.append(VEHICLE_RECORD.pack(
+                    vehicles.kinds[row], vehicles.capacities[row],
+                    vehicles.id_hi[row], vehicles.id_lo[row],
+                    -1 if color is None else strings[str(color)],
+                    vehicles.cars[row],
+                    -1 if custom is None else strings[str(custom)],
+                ))
+            f.write(b"".join(chunk))
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Файл состояния повреждён: неожиданный конец файла")
+    return data
+
+
+def _load_binary(company, path):
+    with open(path, "rb") as f:
+        magic, version, n_clients, n_vehicles, n_strings = BINARY_HEADER.unpack(
+            _read_exact(f, BINARY_HEADER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError("Файл не является двоичным состоянием компании")
+        if version != BINARY_VERSION:
+            raise ValueError(f"Неподдерживаемая версия файла состояния: {version}")
+
+        strings = []
+        for _ in range(n_strings):
+            (length,) = STRING_LENGTH.unpack(_read_exact(f, STRING_LENGTH.size))
+            strings.append(_read_exact(f, length).decode("utf-8"))
+
+        for start in range(0, n_clients, CHUNK):
+            count = min(CHUNK, n_clients - start)
+            names, weights, vip = [], array("d"), array("b")
+            for name, weight, flag in CLIENT_RECORD.iter_unpack(_read_exact(f, count * CLIENT_RECORD.size)):
+                names.append(strings[name])
+                weights.append(weight)
+                vip.append(flag)
+            company.clients.extend_columns({"names": names, "weights": weights, "vip": vip})
+
+        for start in range(0, n_vehicles, CHUNK):
+            count = min(CHUNK, n_vehicles - start)
+            columns = {
+                "kinds": array("b"), "capacities": array("d"),
+                "id_hi": array("Q"), "id_lo": array("Q"),
+                "colors": [], "cars": array("q"), "custom_ids": {},
+            }
+            records = VEHICLE_RECORD.iter_unpack(_read_exact(f, count * VEHICLE_RECORD.size))
+            for i, (kind, cap, hi, lo, color, cars, custom) in enumerate(records):
+                columns["kinds"].append(kind)
+                columns["capacities"].append(cap)
+                columns["id_hi"].append(hi)
+                columns["id_lo"].append(lo)
+                columns["colors"].append(None if color < 0 else strings[color])
+                columns["cars"].append(cars)
+                if custom >= 0:
+                    columns["custom_ids"][i] = strings[custom]
+            company.vehicles.extend_columns(columns)
@@ -0,0 +1,131 @@
+from array import array
+from bisect import bisect_left, insort
+
+
+class Registry:
+    # Реестр строк хранилища по стабильному ID (store.ids). ID растут вместе
+    # с номером строки и не переиспользуются, поэтому номер строки — это
+    # сдвиг ID от первого минус число удалённых ID перед ним. Удалённые ID
+    # внутри диапазона держатся отсортированными (holes); пока удалений не
+    # было, поиск — одна арифметическая операция, после них — деление
+    # пополам по holes. Само удаление остаётся O(n): колонки хранилища
+    # сдвигаются (memmove), а подписчики (отпечаток, индексы) обновляют
+    # свои массивы; реестр ускоряет поиск, а не удаление.
+    #
+    # Представления из get() привязаны к ID записи (store.row_of) и после
+    # удалений других строк указывают на ту же запись.
+    #
+    # key(row) — необязательный внешний ключ строки (vehicle_id); словарь
+    # ключ -> ID строится при первом поиске по ключу и дальше ведётся по
+    # событиям. Ключ считается уникальным.
+    #
+    # version растёт при каждом сдвиге строк (удаление, очистка, загрузка):
+    # кто запомнил голый номер строки вместе с version, видит, что номер
+    # устарел.
+    def __init__(self, store, key=None):
+        self.store = store
+        self.key = key
+        self.version = 0
+        self._holes = array("q")
+        self._keys = None
+        self._deleting = None
+        store.listeners.append(self._on_event)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        # ID в порядке строк (он же порядок добавления)
+        return iter(self.store.ids)
+
+    def __contains__(self, row_id):
+        return self._find_row(row_id) is not None
+
+    def _find_row(self, row_id):
+        ids = self.store.ids
+        if not len(ids) or not ids[0] <= row_id <= ids[-1]:
+            return None
+        holes = self._holes
+        row = row_id - ids[0]
+        if holes:
+            pos = bisect_left(holes, row_id)
+            if pos < len(holes) and holes[pos] == row_id:
+                return None
+            row -= pos
+        return row
+
+    def row(self, row_id: int):
+        row = self._find_row(row_id)
+        if row is None:
+            raise KeyError(f"Нет строки с ID {row_id}")
+        return row
+
+    def id_of(self, row: int):
+        return self.store.ids[self.store._index(row)]
+
+    def is_current(self, row: int, row_id: int):
+        # Номер строки, запомненный раньше, всё ещё указывает на эту запись
+        ids = self.store.ids
+        return 0 <= row < len(ids) and ids[row] == row_id
+
+    def get(self, row_id: int):
+        return self.store[self.row(row_id)]
+
+    def update(self, row_id: int, obj):
+        self.store[self.row(row_id)] = obj
+
+    def delete(self, row_id: int):
+        return self.store.pop(self.row(row_id))
+
+    def find(self, key):
+        # ID строки по внешнему ключу
+        if self._keys is None:
+            key_of, ids = self.key, self.store.ids
+            self._keys = {key_of(row): ids[row] for row in range(len(ids))}
+        row_id = self._keys.get(key)
+        if row_id is None:
+            raise KeyError(f"Нет записи {key}")
+        return row_id
+
+    def _on_event(self, event, row):
+        ids = self.store.ids
+        if event in ("insert", "extend"):
+            # После удаления последних строк новые ID идут с пропуском
+            if row > 0 and ids[row] != ids[row - 1] + 1:
+                self._holes.extend(range(ids[row - 1] + 1, ids[row]))
+            if self._keys is not None:
+                for r in range(row, len(ids)):
+                    self._keys[self.key(r)] = ids[r]
+        elif event == "before_update":
+            self._forget_key(row)
+        elif event == "update":
+            if self._keys is not None:
+                self._keys[self.key(row)] = ids[row]
+        elif event == "before_delete":
+            self._deleting = ids[row]
+            self._forget_key(row)
+        elif event == "delete":
+            self.version += 1
+            self._remove_id(self._deleting)
+        elif event == "clear":
+            self.version += 1
+            del self._holes[:]
+            self._keys = None
+
+    def _forget_key(self, row):
+        if self._keys is not None:
+            key = self.key(row)
+            if self._keys.get(key) == self.store.ids[row]:
+                del self._keys[key]
+
+    def _remove_id(self, row_id):
+        ids, holes = self.store.ids, self._holes
+        if not len(ids):
+            del holes[:]
+        elif row_id < ids[0]:
+            # удалена первая строка: пропуски до новой первой не нужны
+            del holes[:bisect_left(holes, ids[0])]
+        elif row_id > ids[-1]:
+            del holes[bisect_left(holes, ids[-1]):]
+        else:
+            insort(holes, row_id)
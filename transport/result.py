@@ -0,0 +1,122 @@
+from array import array
+from functools import cached_property
+
+
+def _copied(column):
+    # Копия колонки хранилища; колонка снимка (memoryview) копируется в массив,
+    # чтобы результат не держал отображение файла
+    if isinstance(column, memoryview):
+        value = array(column.format)
+        value.frombytes(column.cast("B"))
+        return value
+    return column[:]
+
+
+class DistributionResult:
+    # Результат optimize_cargo_distribution. Как и раньше, ведёт себя как
+    # список транспорта в порядке загрузки; недогруженные клиенты лежат
+    # в компактных массивах. Метрики считаются при первом обращении по копиям
+    # колонок, снятым при создании результата, поэтому правки компании после
+    # распределения их не меняют.
+    def __init__(self, company, vehicles=(), short_rows=None, short_amounts=None,
+                 message: str = None):
+        self.company = company
+        self.vehicles = list(vehicles)
+        # Строки клиентов, которым не хватило места, и нераспределённый остаток
+        self.short_rows = short_rows if short_rows is not None else array("q")
+        self.short_amounts = short_amounts if short_amounts is not None else array("d")
+        # Почему распределение не выполнялось (нет транспорта/клиентов)
+        self.message = message
+
+        # Копии массивов дешевле подсчёта метрик, который может не понадобиться
+        self._capacities = _copied(company.vehicles.capacities)
+        self._loads = _copied(company.vehicles.loads)
+        self._weights = _copied(company.clients.weights)
+        self._client_rows = _copied(company.allocation.client_rows)
+        names = company.clients.names
+        self._short_names = [names[row] for row in self.short_rows]
+
+    def __len__(self):
+        return len(self.vehicles)
+
+    def __iter__(self):
+        return iter(self.vehicles)
+
+    def __getitem__(self, idx):
+        return self.vehicles[idx]
+
+    def __repr__(self):
+        if self.message:
+            return f"DistributionResult({self.message!r})"
+        return (f"DistributionResult(vehicles={len(self.vehicles)}, "
+                f"unallocated_clients={self.unallocated_clients}, "
+                f"unallocated={self.unallocated:.2f})")
+
+    def shortfalls(self):
+        # (имя клиента, нераспределённый остаток) в порядке распределения
+        return zip(self._short_names, self.short_amounts)
+
+    @property
+    def unallocated_clients(self):
+        return len(self.short_rows)
+
+    @cached_property
+    def unallocated(self):
+        return sum(self.short_amounts)
+
+    @cached_property
+    def capacity(self):
+        return sum(c for c in self._capacities if c > 0)
+
+    @cached_property
+    def load(self):
+        return sum(self._loads)
+
+    @cached_property
+    def demand(self):
+        return sum(w for w in self._weights if w > 0)
+
+    @cached_property
+    def used_vehicles(self):
+        return sum(1 for x in self._loads if x > 0)
+
+    @cached_property
+    def utilization(self):
+        # Доля суммарной вместимости, занятая грузами
+        return self.load / self.capacity if self.capacity else 0.0
+
+    @cached_property
+    def fill_ratio(self):
+        # Доля спроса клиентов, которая поместилась в транспорт
+        return (self.demand - self.unallocated) / self.demand if self.demand else 1.0
+
+    @cached_property
+    def _part_counts(self):
+        counts = {}
+        for row in self._client_rows:
+            counts[row] = counts.get(row, 0) + 1
+        return counts
+
+    @cached_property
+    def splits(self):
+        # Сколько дополнительных частей дало деление грузов
+        return len(self._client_rows) - len(self._part_counts)
+
+    @cached_property
+    def split_clients(self):
+        # Сколько клиентов разложено больше чем по одному транспорту
+        return sum(1 for n in self._part_counts.values() if n > 1)
+
+    def metrics(self):
+        return {
+            "vehicles": len(self._capacities),
+            "used_vehicles": self.used_vehicles,
+            "capacity": self.capacity,
+            "load": self.load,
+            "utilization": self.utilization,
+            "fill_ratio": self.fill_ratio,
+            "unallocated": self.unallocated,
+            "unallocated_clients": self.unallocated_clients,
+            "splits": self.splits,
+            "split_clients": self.split_clients,
+        }
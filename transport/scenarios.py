@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .transportcompany import TransportCompany
+
+# Базовое состояние компании в процессе-исполнителе; передаётся один раз
+# через initializer пула, а не вместе с каждой задачей
+_BASE_STATE = None
+
+
+def _detached(obj):
+    # Представление строки хранилища тянуло бы при передаче в процесс
+    # всю компанию; сценарий держит отдельные копии
+    store = getattr(obj, "_store", None)
+    if store is None:
+        return obj
+    return store._detached(store.row_of(obj))
+
+
+class Scenario:
+    # Сценарий "что если" — набор изменений относительно базовой компании
+    def __init__(self, name: str, add_vehicles=(), remove_vehicles=(),
+                 add_clients=(), vip_share=None, strategy: str = "split"):
+        self.name = name
+        self.add_vehicles = [_detached(v) for v in add_vehicles]  # объекты Vehicle/Truck/Train
+        self.remove_vehicles = list(remove_vehicles)              # vehicle_id
+        self.add_clients = [_detached(c) for c in add_clients]    # объекты Client
+        self.vip_share = vip_share                    # целевая доля VIP-клиентов, 0..1
+        self.strategy = strategy
+
+    def apply(self, company: TransportCompany):
+        if self.remove_vehicles:
+            retired = set(self.remove_vehicles)
+            vehicles = company.vehicles
+            for row in reversed(range(len(vehicles))):
+                if vehicles.get_vehicle_id(row) in retired:
+                    vehicles.pop(row)
+
+        for vehicle in self.add_vehicles:
+            company.add_vehicle(vehicle)
+        for client in self.add_clients:
+            company.add_client(client)
+
+        if self.vip_share is not None:
+            # Недостающих VIP набираем из обычных клиентов по порядку добавления;
+            # через set_value, чтобы отпечаток и индексы узнали об изменении
+            clients = company.clients
+            vip = clients.vip
+            missing = round(self.vip_share * len(vip)) - sum(vip)
+            for row in range(len(vip)):
+                if missing <= 0:
+                    break
+                if not vip[row]:
+                    clients.set_value("vip", row, True)
+                    missing -= 1
+
+    def __repr__(self):
+        return f"Scenario(name='{self.name}')"
+
+
+def company_state(company: TransportCompany):
+    return {
+        "name": company.name,
+        "clients": company.clients.export_columns(),
+        "vehicles": company.vehicles.export_columns(),
+    }
+
+
+def company_from_state(state):
+    company = TransportCompany(state["name"])
+    company.clients.load_columns(state["clients"])
+    company.vehicles.load_columns(state["vehicles"])
+    return company
+
+
+def _init_worker(state):
+    global _BASE_STATE
+    _BASE_STATE = state
+
+
+def _run_scenario(scenario: Scenario):
+    company = company_from_state(_BASE_STATE)
+    scenario.apply(company)
+    result = company.optimize_cargo_distribution(strategy=scenario.strategy)
+    metrics = result.metrics()
+    metrics["scenario"] = scenario.name
+    # Распределение не выполнялось (нет транспорта или клиентов)
+    metrics["message"] = result.message
+    return metrics
+
+
+def run_scenarios(company: TransportCompany, scenarios, max_workers=None, include_base: bool = True):
+    # Параллельно считает сценарии над копиями company и возвращает
+    # список метрик (утилизация, нераспределённый тоннаж) по каждому
+    scenarios = list(scenarios)
+    if include_base:
+        scenarios.insert(0, Scenario("base"))
+
+    state = company_state(company)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(state,)) as pool:
+        return list(pool.map(_run_scenario, scenarios))
+
+
+def format_comparison(results):
+    lines = [f"{'Сценарий':<20} {'Транспорт':>10} {'Занято':>8} {'Утилизация':>11} {'Не распределено, т':>19}"]
+    for r in results:
+        if r.get("message"):
+            lines.append(f"{r['scenario']:<20} {r['message']}")
+            continue
+        lines.append(
+            f"{r['scenario']:<20} {r['vehicles']:>10} {r['used_vehicles']:>8} "
+            f"{r['utilization']:>10.1%} {r['unallocated']:>19.2f}"
+        )
+    return "\n".join(lines)
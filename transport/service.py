@@ -0,0 +1,231 @@
+import asyncio
+import json
+import math
+
+from .batch import iter_clients, iter_vehicles
+from .transportcompany import TransportCompany
+from .vehicle import Vehicle
+
+# Протокол: по TCP на localhost строки JSON (как NDJSON), на каждую строку
+# запроса — одна строка ответа в том же порядке:
+#   {"op": "client", "name": ..., "cargo_weight": ..., "is_vip": ...}
+#   {"op": "vehicle", "type": "Truck"|"Train"|"Vehicle", "capacity": ..., ...}
+#   {"op": "flush"}        — дождаться записи всего принятого ранее
+#   {"op": "distribute", "strategy": "split", "engine": "python"}
+#   {"op": "status"}
+DEFAULT_PORT = 8765
+VEHICLE_TYPES = ("Vehicle", "Truck", "Train")
+
+
+def _number(request, field):
+    # Число из запроса; строка с числом тоже подходит, bool и NaN — нет
+    value = request[field]
+    if isinstance(value, bool):
+        raise ValueError(f"Поле '{field}' должно быть числом")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Поле '{field}' должно быть числом") from None
+    if not math.isfinite(value):
+        raise ValueError(f"Поле '{field}' должно быть конечным числом")
+    return value
+
+
+def _text(request, field, required=True):
+    value = request.get(field) if not required else request[field]
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"Поле '{field}' должно быть строкой")
+    return value
+
+
+def _client_record(request):
+    # Проверенная запись клиента: в хранилище попадают только str/float/bool,
+    # иначе ошибка всплыла бы позже — в отпечатке при каждом распределении
+    is_vip = request.get("is_vip", False)
+    if not isinstance(is_vip, bool):
+        raise ValueError("Поле 'is_vip' должно быть true или false")
+    return {"name": _text(request, "name"), "cargo_weight": _number(request, "cargo_weight"),
+            "is_vip": is_vip}
+
+
+def _vehicle_record(request):
+    kind = request.get("type", "Vehicle")
+    if kind not in VEHICLE_TYPES:
+        raise ValueError(f"Неизвестный тип транспорта: {kind}")
+    record = {"type": kind, "capacity": _number(request, "capacity"),
+              "vehicle_id": _text(request, "vehicle_id", required=False)}
+    if kind == "Truck":
+        record["color"] = _text(request, "color", required=False) or ""
+    elif kind == "Train":
+        cars = request.get("number_of_cars", 0)
+        if isinstance(cars, bool) or not isinstance(cars, int):
+            raise ValueError("Поле 'number_of_cars' должно быть целым числом")
+        record["number_of_cars"] = cars
+    return record
+
+
+class DistributionService:
+    # Приём регистраций идёт конкурентно со всех соединений в общую очередь;
+    # одна задача выбирает из неё пачки и пишет их в компанию массово.
+    # Распределение считается в потоке-исполнителе под тем же замком, что и
+    # запись пачек: приём продолжается, пока очередь не заполнится, а дальше
+    # чтение из сокетов останавливается (обратное давление через TCP).
+    def __init__(self, company: TransportCompany, host: str = "127.0.0.1",
+                 port: int = DEFAULT_PORT, queue_size: int = 10000,
+                 batch_size: int = 1000, batch_delay: float = 0.005):
+        self.company = company
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._lock = asyncio.Lock()
+        # Номер последней принятой и последней записанной регистрации
+        self._accepted = 0
+        self._committed = 0
+        self._committed_changed = asyncio.Condition()
+
+        self._server = None
+        self._consumer = None
+        # Задачи открытых соединений: close() отменяет их и дожидается
+        self._handlers = set()
+
+    async def start(self):
+        self._consumer = asyncio.create_task(self._consume())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Порт 0 — свободный порт, выбранный системой
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+        tasks = list(self._handlers)
+        if self._consumer is not None:
+            tasks.append(self._consumer)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._server is not None:
+            # wait_closed() в 3.12+ ждёт и закрытия всех соединений
+            await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    response = await self._dispatch(json.loads(line))
+                except KeyError as e:
+                    response = {"ok": False, "error": f"Нет поля {e}"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                # drain() ждёт сокет, только если буфер ответов выше порога
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # разрыв соединения или остановка сервиса
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _dispatch(self, request):
+        op = request.get("op")
+        if op == "client":
+            await self._enqueue(next(iter_clients([_client_record(request)])))
+            return {"ok": True}
+        if op == "vehicle":
+            await self._enqueue(next(iter_vehicles([_vehicle_record(request)])))
+            return {"ok": True}
+        if op == "flush":
+            await self._wait_committed(self._accepted)
+            return {"ok": True, **self._counts()}
+        if op == "distribute":
+            return await self._distribute(request.get("strategy", "split"),
+                                          request.get("engine", "python"))
+        if op == "status":
+            return {"ok": True, "queued": self.queue.qsize(), **self._counts()}
+        raise ValueError(f"Неизвестная операция: {op}")
+
+    def _counts(self):
+        return {"clients": len(self.company.clients), "vehicles": len(self.company.vehicles)}
+
+    async def _enqueue(self, item):
+        # Блокируется, пока очередь полна, — соединение перестаёт читаться
+        await self.queue.put(item)
+        self._accepted += 1
+
+    async def _wait_committed(self, number):
+        async with self._committed_changed:
+            await self._committed_changed.wait_for(lambda: self._committed >= number)
+
+    async def _consume(self):
+        while True:
+            batch = [await self.queue.get()]
+            self._drain(batch)
+            if len(batch) < self.batch_size and self.batch_delay:
+                # Короткая пауза собирает пачку крупнее при частых одиночных запросах
+                await asyncio.sleep(self.batch_delay)
+                self._drain(batch)
+            async with self._lock:
+                self._commit(batch)
+            self._committed += len(batch)
+            async with self._committed_changed:
+                self._committed_changed.notify_all()
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    def _commit(self, batch):
+        clients = [item for item in batch if not isinstance(item, Vehicle)]
+        if clients:
+            self.company.clients.extend_columns({
+                "names": [c.name for c in clients],
+                "weights": [c.cargo_weight for c in clients],
+                "vip": [c.is_vip for c in clients],
+            })
+        for item in batch:
+            if isinstance(item, Vehicle):
+                self.company.add_vehicle(item)
+
+    async def _distribute(self, strategy, engine):
+        # Распределение видит всё, что было принято до запроса
+        await self._wait_committed(self._accepted)
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                None, lambda: self.company.optimize_cargo_distribution(engine=engine, strategy=strategy))
+            if result.message:
+                return {"ok": False, "error": result.message}
+            metrics = await loop.run_in_executor(None, result.metrics)
+        return {"ok": True, "fingerprint": self.company.fingerprint, **metrics}
+
+
+def serve(company: TransportCompany = None, host: str = "127.0.0.1", port: int = DEFAULT_PORT, **kwargs):
+    # Запускает сервис до прерывания (Ctrl+C)
+    company = company if company is not None else TransportCompany("Service")
+
+    async def run():
+        service = DistributionService(company, host, port, **kwargs)
+        await service.start()
+        print(f"Сервис распределения: {service.host}:{service.port}")
+        await service.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
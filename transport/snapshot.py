@@ -0,0 +1,169 @@
+import mmap
+import struct
+from array import array
+
+# Снимок компании (.tcsnap) — колонки лежат в файле как есть, выровненные
+# по 8 байт, поэтому после mmap их можно сразу использовать как колонки
+# хранилищ (memoryview) без разбора записей. Несколько процессов, открывших
+# один снимок только для чтения, делят одни и те же страницы памяти.
+# При первом изменении хранилище копирует колонки в обычные массивы.
+SNAPSHOT_EXTENSION = ".tcsnap"
+SNAPSHOT_MAGIC = b"TCSNAP\x00\x00"
+SNAPSHOT_VERSION = 1
+
+# Блоки файла в порядке записи: (имя, формат memoryview)
+BLOCKS = (
+    ("client_names", "I"),
+    ("client_weights", "d"),
+    ("client_vip", "b"),
+    ("vehicle_kinds", "b"),
+    ("vehicle_capacities", "d"),
+    ("vehicle_id_hi", "Q"),
+    ("vehicle_id_lo", "Q"),
+    ("vehicle_colors", "i"),
+    ("vehicle_cars", "q"),
+    ("vehicle_custom_ids", "i"),
+    ("string_offsets", "Q"),
+    ("string_data", "B"),
+)
+
+# magic, версия, клиентов, транспорта, строк, затем (смещение, длина) блоков
+HEADER = struct.Struct("<8sH6xQQQ" + "QQ" * len(BLOCKS))
+
+
+class StringColumn:
+    # Колонка строк поверх таблицы строк снимка: номер -> str (или None при -1).
+    # Строки декодируются при обращении, повторы берутся из кэша.
+    def __init__(self, indexes, offsets, data):
+        self.indexes = indexes
+        self.offsets = offsets
+        self.data = data
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def string(self, index):
+        if index < 0:
+            return None
+        value = self._cache.get(index)
+        if value is None:
+            value = str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+            self._cache[index] = value
+        return value
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.string(i) for i in self.indexes[row]]
+        return self.string(self.indexes[row])
+
+    def __iter__(self):
+        for index in self.indexes:
+            yield self.string(index)
+
+
+def _align(f):
+    pad = -f.tell() % 8
+    if pad:
+        f.write(b"\x00" * pad)
+
+
+def write_snapshot(company, path: str):
+    clients, vehicles = company.clients, company.vehicles
+
+    strings = {}
+
+    def string_index(value):
+        if value is None:
+            return -1
+        return strings.setdefault(str(value), len(strings))
+
+    client_names = array("I", (string_index(v) for v in clients.names))
+    vehicle_colors = array("i", (string_index(v) for v in vehicles.colors))
+    vehicle_custom = array("i", (string_index(vehicles.custom_ids.get(row))
+                                 for row in range(len(vehicles))))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    blocks = {
+        "client_names": client_names,
+        "client_weights": clients.weights,
+        "client_vip": clients.vip,
+        "vehicle_kinds": vehicles.kinds,
+        "vehicle_capacities": vehicles.capacities,
+        "vehicle_id_hi": vehicles.id_hi,
+        "vehicle_id_lo": vehicles.id_lo,
+        "vehicle_colors": vehicle_colors,
+        "vehicle_cars": vehicles.cars,
+        "vehicle_custom_ids": vehicle_custom,
+        "string_offsets": offsets,
+        "string_data": encoded,
+    }
+
+    with open(path, "wb") as f:
+        f.write(b"\x00" * HEADER.size)
+        positions = []
+        for name, _ in BLOCKS:
+            _align(f)
+            start = f.tell()
+            block = blocks[name]
+            if name == "string_data":
+                for data in block:
+                    f.write(data)
+            else:
+                f.write(memoryview(block).cast("B"))
+            positions.extend((start, f.tell() - start))
+
+        f.seek(0)
+        f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                            len(clients), len(vehicles), len(strings), *positions))
+
+
+def open_snapshot(path: str):
+    # Возвращает словарь memoryview по именам блоков; файл отображён только для чтения
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < HEADER.size:
+        raise ValueError("Файл снимка повреждён: нет заголовка")
+    magic, version, n_clients, n_vehicles, n_strings, *positions = HEADER.unpack_from(mm)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Файл не является снимком компании")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+
+    raw = memoryview(mm)
+    blocks = {"clients": n_clients, "vehicles": n_vehicles, "strings": n_strings}
+    for i, (name, fmt) in enumerate(BLOCKS):
+        start, length = positions[2 * i], positions[2 * i + 1]
+        if start + length > len(mm):
+            raise ValueError("Файл снимка повреждён: блок за концом файла")
+        blocks[name] = raw[start:start + length].cast(fmt)
+    return blocks
+
+
+def load_snapshot(company, path: str):
+    # Подключает колонки снимка к хранилищам компании без копирования
+    blocks = open_snapshot(path)
+    offsets, data = blocks["string_offsets"], blocks["string_data"]
+
+    company.clients.attach_columns({
+        "names": StringColumn(blocks["client_names"], offsets, data),
+        "weights": blocks["client_weights"],
+        "vip": blocks["client_vip"],
+    })
+
+    custom = blocks["vehicle_custom_ids"]
+    custom_names = StringColumn(custom, offsets, data)
+    company.vehicles.attach_columns({
+        "kinds": blocks["vehicle_kinds"],
+        "capacities": blocks["vehicle_capacities"],
+        "id_hi": blocks["vehicle_id_hi"],
+        "id_lo": blocks["vehicle_id_lo"],
+        "colors": StringColumn(blocks["vehicle_colors"], offsets, data),
+        "cars": blocks["vehicle_cars"],
+        "custom_ids": {row: custom_names[row] for row in range(len(custom)) if custom[row] >= 0},
+    })
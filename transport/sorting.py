@@ -0,0 +1,100 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class SortedRows:
+    # Номера строк хранилища в порядке сортировки; строки вычисляются
+    # только для запрошенных позиций
+    def __init__(self, index, order, descending: bool):
+        self._index = index
+        self._ids = order[1]
+        self._descending = descending
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += len(self._ids)
+        if not 0 <= pos < len(self._ids):
+            raise IndexError("Индекс вне диапазона")
+        if self._descending:
+            pos = len(self._ids) - 1 - pos
+        return self._index.row_for(self._ids[pos])
+
+
+class SortIndex:
+    # Заранее отсортированные перестановки строк хранилища по колонкам.
+    # Для колонки держатся ключи в порядке сортировки и id строк (порядок
+    # по (ключ, id)); id не сдвигаются при удалении, поэтому правка строки
+    # стоит двух бинарных поисков. Перестановка строится при первой
+    # сортировке по колонке и поддерживается по событиям хранилища.
+    # Производные колонки (загрузка и т. п.) меняются без событий —
+    # их перестановки сбрасываются любым событием и методом invalidate().
+    def __init__(self, store, keys: dict, derived=()):
+        self.store = store
+        self.keys = keys
+        self.derived = set(derived)
+        self._orders = {}        # колонка -> (ключи, array('q') id)
+        store.listeners.append(self._on_event)
+
+    def row_for(self, row_id):
+        ids = self.store.ids
+        # Без удалений id идут подряд и номер строки вычисляется сдвигом
+        if ids[-1] - ids[0] == len(ids) - 1:
+            return row_id - ids[0]
+        return bisect_left(ids, row_id)
+
+    def invalidate(self, *columns):
+        for column in columns or list(self._orders):
+            self._orders.pop(column, None)
+
+    def _order(self, column):
+        order = self._orders.get(column)
+        if order is None:
+            key = self.keys[column]
+            values = [key(row) for row in range(len(self.store))]
+            # Устойчивая сортировка: при равных ключах строки идут по id
+            rows = sorted(range(len(values)), key=values.__getitem__)
+            ids = self.store.ids
+            order = self._orders[column] = (
+                [values[row] for row in rows],
+                array("q", [ids[row] for row in rows]),
+            )
+        return order
+
+    def rows(self, column: str, descending: bool = False, subset=None):
+        # Строки в порядке колонки; subset — уже отобранные строки (фильтр)
+        if subset is not None:
+            # Обратный порядок — разворот, как и у перестановки, чтобы
+            # равные ключи шли одинаково с фильтром и без него
+            rows = sorted(subset, key=self.keys[column])
+            return rows[::-1] if descending else rows
+        return SortedRows(self, self._order(column), descending)
+
+    def _find(self, keys, ids, key, row_id):
+        lo = bisect_left(keys, key)
+        hi = bisect_right(keys, key, lo)
+        return bisect_left(ids, row_id, lo, hi)
+
+    def _on_event(self, event, row):
+        if not self._orders:
+            return
+        if self.derived:
+            self.invalidate(*self.derived)
+        if event in ("insert", "update"):
+            row_id = self.store.ids[row]
+            for column, (keys, ids) in self._orders.items():
+                key = self.keys[column](row)
+                pos = self._find(keys, ids, key, row_id)
+                keys.insert(pos, key)
+                ids.insert(pos, row_id)
+        elif event in ("before_update", "before_delete"):
+            row_id = self.store.ids[row]
+            for column, (keys, ids) in self._orders.items():
+                pos = self._find(keys, ids, self.keys[column](row), row_id)
+                del keys[pos]
+                del ids[pos]
+        elif event not in ("delete", "load"):
+            # массовое добавление, очистка, загрузка — перестроим при запросе
+            self._orders.clear()
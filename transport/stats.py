@@ -0,0 +1,70 @@
+import contextlib
+import sys
+import time
+
+# Общий пустой контекст для выключенной статистики
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class _Phase:
+    __slots__ = ("stats", "name", "start", "blocks")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stats = self.stats
+        stats.timings[self.name] = stats.timings.get(self.name, 0.0) + elapsed
+        stats.blocks[self.name] = (stats.blocks.get(self.name, 0)
+                                   + sys.getallocatedblocks() - self.blocks)
+        return False
+
+
+class Stats:
+    # Необязательная статистика горячих путей: время и прирост числа
+    # выделенных блоков памяти по фазам, плюс счётчики событий.
+    # Пока enabled=False, phase() отдаёт общий пустой контекст, а счётчики
+    # в циклах вызывающий код считает только при включённой статистике.
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.timings = {}     # фаза -> секунды (накопительно)
+        self.blocks = {}      # фаза -> прирост выделенных блоков
+        self.counters = {}
+
+    def reset(self):
+        self.timings = {}
+        self.blocks = {}
+        self.counters = {}
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self):
+        return {
+            "timings": dict(self.timings),
+            "blocks": dict(self.blocks),
+            "counters": dict(self.counters),
+        }
+
+    def summary(self):
+        # Одна строка для строки состояния и журнала
+        parts = [f"{name} {seconds * 1000:.1f} мс ({self.blocks[name]:+d} бл.)"
+                 for name, seconds in self.timings.items()]
+        parts += [f"{name}={value}" for name, value in self.counters.items()]
+        return ", ".join(parts)
+
+    def __repr__(self):
+        return f"Stats(enabled={self.enabled}, {self.summary() or 'пусто'})"
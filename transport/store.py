@@ -0,0 +1,451 @@
+import sys
+import uuid
+from array import array
+from bisect import bisect_left
+
+from .allocation import AllocationTable
+from .client import Client
+from .vehicle import Vehicle, Truck, Train
+
+_MASK64 = (1 << 64) - 1
+
+# Код типа транспорта в колонке kinds
+VEHICLE_KINDS = (Vehicle, Truck, Train)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _ColumnStore:
+    # Общая часть колоночных хранилищ: строка адресуется индексом,
+    # а объекты Client/Vehicle выдаются как представления поверх колонок.
+    # Представление привязано к записи по ID (ids), номер строки в нём —
+    # только подсказка: после удалений выше по таблице он находится заново,
+    # а обращение к удалённой записи (pop, clear, загрузка) — LookupError,
+    # а не чтение соседней строки. Присваивание по индексу правит запись
+    # на месте, и прежние представления видят новые значения.
+    #
+    # Из протокола списка есть len, индексы и срезы, итерация, append,
+    # extend, pop, clear, а также in/index/remove/count — по записи, на
+    # которую указывает представление (как по идентичности объекта в
+    # списке). Порядок строк — порядок добавления (ID растут вместе с
+    # номером строки), поэтому insert и sort не поддерживаются: для
+    # пересортировки присвойте компании новый список. Числа хранятся в
+    # колонках массивов, так что целый вес читается обратно как float.
+    columns = ()
+    # Колонки, описывающие содержимое (без производных значений вроде загрузки)
+    state_columns = ()
+
+    def __init__(self):
+        # Подписчики на изменения строк: callback(event, row).
+        # event — "insert", "before_update"/"update", "before_delete"/"delete",
+        # "extend" (row — первая из добавленных массово строк),
+        # "clear" (row = -1) или "load" (ручная загрузка транспорта).
+        # before_* приходят, пока строка ещё хранит старые значения.
+        self.listeners = []
+
+        # Компактные целочисленные ID строк; растут вместе с номером строки
+        self.ids = array("q")
+        self._next_id = 0
+
+        # Колонки подключены извне (memoryview снимка) и пока только читаются
+        self._external = False
+
+    def _notify(self, event, row):
+        for callback in self.listeners:
+            callback(event, row)
+
+    def __len__(self):
+        return len(getattr(self, self.columns[0]))
+
+    def _index(self, idx):
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("Индекс вне диапазона")
+        return idx
+
+    def row_of(self, obj):
+        # Текущий номер строки представления; ID растут вместе с номером
+        # строки, поэтому сдвинутая строка ищется делением пополам
+        row, row_id, ids = obj._row, obj._id, self.ids
+        if row < len(ids) and ids[row] == row_id:
+            return row
+        row = bisect_left(ids, row_id)
+        if row == len(ids) or ids[row] != row_id:
+            raise LookupError("Запись удалена из хранилища")
+        obj._row = row
+        return row
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._view(row) for row in range(*idx.indices(len(self)))]
+        return self._view(self._index(idx))
+
+    def __setitem__(self, idx, obj):
+        self._ensure_writable()
+        row = self._index(idx)
+        self._notify("before_update", row)
+        self._write_row(row, obj)
+        self._bind(obj, row)
+        self._notify("update", row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self._view(row)
+
+    def __contains__(self, obj):
+        if getattr(obj, "_store", None) is not self:
+            return False
+        try:
+            self.row_of(obj)
+        except LookupError:
+            return False
+        return True
+
+    def index(self, obj):
+        if obj not in self:
+            raise ValueError("Объект не является записью хранилища")
+        return obj._row
+
+    def count(self, obj):
+        return int(obj in self)
+
+    def remove(self, obj):
+        self.pop(self.index(obj))
+
+    def __repr__(self):
+        return f"<{type(self).__name__}, строк: {len(self)}>"
+
+    def append(self, obj):
+        self._ensure_writable()
+        for column in self.columns:
+            col = getattr(self, column)
+            col.append(None if isinstance(col, list) else 0)
+        row = len(self) - 1
+        self.ids.append(self._next_id)
+        self._next_id += 1
+        self._write_row(row, obj)
+        self._bind(obj, row)
+        self._notify("insert", row)
+
+    def clear(self):
+        self._ensure_writable(copy=False)
+        for column in self.columns:
+            del getattr(self, column)[:]
+        del self.ids[:]
+        self._after_clear()
+        self._notify("clear", -1)
+
+    def export_columns(self):
+        # Копия колонок содержимого — компактный снимок без объектов на запись
+        return {name: getattr(self, name)[:] for name in self.state_columns}
+
+    def load_columns(self, columns):
+        # Заменяет содержимое хранилища колонками из export_columns()
+        n = len(columns[self.state_columns[0]])
+        self._after_clear()
+        for name in self.columns:
+            if name in columns:
+                value = columns[name][:]
+            elif isinstance(getattr(self, name), list):
+                value = [None] * n
+            else:
+                col = getattr(self, name)
+                value = array(col.typecode, bytes(col.itemsize * n))
+            setattr(self, name, value)
+        self.ids = array("q", range(self._next_id, self._next_id + n))
+        self._next_id += n
+        self._external = False
+        self._notify("clear", -1)
+
+    def attach_columns(self, columns):
+        # Подключает внешние колонки (например, memoryview снимка) без копирования.
+        # Недостающие колонки создаются обычными массивами.
+        n = len(columns[self.state_columns[0]])
+        self._after_clear()
+        for name in self.columns:
+            if name in columns:
+                value = columns[name]
+            elif isinstance(getattr(self, name), list):
+                value = [None] * n
+            else:
+                col = getattr(self, name)
+                value = array(col.typecode, bytes(col.itemsize * n))
+            setattr(self, name, value)
+        self.ids = range(self._next_id, self._next_id + n)
+        self._next_id += n
+        self._external = True
+        self._notify("clear", -1)
+
+    def _ensure_writable(self, copy=True):
+        # Перед первым изменением внешние колонки копируются в массивы/списки
+        if not self._external:
+            return
+        for name in self.columns:
+            col = getattr(self, name)
+            if isinstance(col, (array, list)):
+                continue
+            if isinstance(col, memoryview):
+                value = array(col.format)
+                if copy:
+                    value.frombytes(col.cast("B"))
+            else:
+                value = list(col) if copy else []
+            setattr(self, name, value)
+        self.ids = array("q", self.ids if copy else ())
+        self._external = False
+
+    def extend_columns(self, columns):
+        # Массовое добавление строк готовыми колонками (без объектов на запись);
+        # недостающие колонки заполняются нулями/None
+        n = len(columns[self.state_columns[0]])
+        if not n:
+            return
+        self._ensure_writable()
+        first = len(self)
+        for name in self.columns:
+            col = getattr(self, name)
+            if name in columns:
+                col.extend(map(_intern, columns[name]) if isinstance(col, list) else columns[name])
+            elif isinstance(col, list):
+                col.extend([None] * n)
+            else:
+                col.frombytes(bytes(col.itemsize * n))
+        self.ids.extend(range(self._next_id, self._next_id + n))
+        self._next_id += n
+        self._notify("extend", first)
+
+    def extend(self, items):
+        for obj in items:
+            self.append(obj)
+
+    def pop(self, idx=-1):
+        self._ensure_writable()
+        row = self._index(idx)
+        self._notify("before_delete", row)
+        obj = self._detached(row)
+        for column in self.columns:
+            del getattr(self, column)[row]
+        del self.ids[row]
+        self._after_delete(row)
+        self._notify("delete", row)
+        return obj
+
+    def set_value(self, column, row, value):
+        self._ensure_writable()
+        self._notify("before_update", row)
+        getattr(self, column)[row] = self._convert(column, value)
+        self._notify("update", row)
+
+    def _convert(self, column, value):
+        return value
+
+    def _bind(self, obj, row):
+        # Отдельный объект становится представлением строки хранилища
+        if obj._store is None:
+            obj._store = self
+            obj._row = row
+            obj._id = self.ids[row]
+
+    def _after_delete(self, row):
+        pass
+
+    def _after_clear(self):
+        pass
+
+
+class ClientStore(_ColumnStore):
+    columns = ("names", "weights", "vip")
+    state_columns = columns
+
+    def __init__(self):
+        super().__init__()
+        self.names = []            # интернированные строки
+        self.weights = array("d")
+        self.vip = array("b")
+
+    def _view(self, row):
+        client = Client.__new__(Client)
+        client._store = self
+        client._row = row
+        client._id = self.ids[row]
+        return client
+
+    def _detached(self, row):
+        return Client(self.names[row], self.weights[row], bool(self.vip[row]))
+
+    def _write_row(self, row, client):
+        self.names[row] = _intern(client.name)
+        self.weights[row] = client.cargo_weight
+        self.vip[row] = bool(client.is_vip)
+
+    def _convert(self, column, value):
+        if column == "names":
+            return _intern(value)
+        if column == "vip":
+            return bool(value)
+        return value
+
+
+class VehicleStore(_ColumnStore):
+    columns = ("kinds", "capacities", "loads", "id_hi", "id_lo", "colors", "cars")
+    state_columns = ("kinds", "capacities", "id_hi", "id_lo", "colors", "cars")
+
+    def __init__(self, allocation=None):
+        super().__init__()
+        self.kinds = array("b")
+        self.capacities = array("d")
+        self.loads = array("d")
+        # uuid хранится как 128-битное число в двух колонках
+        self.id_hi = array("Q")
+        self.id_lo = array("Q")
+        self.colors = []           # интернированные строки, None не для грузовиков
+        self.cars = array("q")
+
+        # ID, которые не являются uuid, — редкие, держим в словаре по номеру строки
+        self.custom_ids = {}
+
+        # Грузы в транспорте хранятся в общей таблице распределения
+        self.allocation = allocation if allocation is not None else AllocationTable()
+
+    def _view(self, row):
+        kind = VEHICLE_KINDS[self.kinds[row]]
+        vehicle = kind.__new__(kind)
+        vehicle._store = self
+        vehicle._row = row
+        vehicle._id = self.ids[row]
+        return vehicle
+
+    def _detached(self, row):
+        kind = VEHICLE_KINDS[self.kinds[row]]
+        if kind is Truck:
+            vehicle = Truck(self.capacities[row], self.colors[row])
+        elif kind is Train:
+            vehicle = Train(self.capacities[row], self.cars[row])
+        else:
+            vehicle = Vehicle(self.capacities[row])
+        vehicle.vehicle_id = self.get_vehicle_id(row)
+        vehicle.current_load = self.loads[row]
+        vehicle.clients_list = [
+            Client(part.name, part.cargo_weight, part.is_vip)
+            for part in self.get_clients_list(row)
+        ]
+        return vehicle
+
+    def _write_row(self, row, vehicle):
+        if isinstance(vehicle, Train):
+            self.kinds[row] = 2
+            self.colors[row] = None
+            self.cars[row] = vehicle.number_of_cars
+        elif isinstance(vehicle, Truck):
+            self.kinds[row] = 1
+            self.colors[row] = _intern(vehicle.color)
+            self.cars[row] = 0
+        else:
+            self.kinds[row] = 0
+            self.colors[row] = None
+            self.cars[row] = 0
+
+        self.capacities[row] = vehicle.capacity
+        self.loads[row] = vehicle.current_load
+        self.set_vehicle_id(row, vehicle.vehicle_id)
+        # Прежние грузы строки сбрасывает владелец таблицы (компания) по событию
+        clients = list(vehicle.clients_list)
+        if clients:
+            self.set_clients_list(row, clients)
+
+    def _after_delete(self, row):
+        self.custom_ids = {r - (r > row): v for r, v in self.custom_ids.items() if r != row}
+
+    def _after_clear(self):
+        self.custom_ids = {}
+        self.allocation.clear()
+
+    def export_columns(self):
+        columns = super().export_columns()
+        columns["custom_ids"] = dict(self.custom_ids)
+        return columns
+
+    def load_columns(self, columns):
+        super().load_columns(columns)
+        self.custom_ids = dict(columns.get("custom_ids", {}))
+
+    def attach_columns(self, columns):
+        super().attach_columns(columns)
+        self.custom_ids = dict(columns.get("custom_ids", {}))
+
+    def extend_columns(self, columns):
+        # custom_ids во входных колонках нумеруются с нуля от первой новой строки
+        first = len(self)
+        for row, value in columns.get("custom_ids", {}).items():
+            self.custom_ids[first + row] = value
+        super().extend_columns(columns)
+
+    def set_value(self, column, row, value):
+        if column == "loads":
+            # загрузка — производное значение, подписчиков не беспокоим
+            self.loads[row] = value
+        elif column == "vehicle_id":
+            # ID лежит в двух колонках или в custom_ids
+            self._ensure_writable()
+            self._notify("before_update", row)
+            self.set_vehicle_id(row, value)
+            self._notify("update", row)
+        else:
+            super().set_value(column, row, value)
+
+    def _convert(self, column, value):
+        if column == "colors":
+            return _intern(value)
+        return value
+
+    def get_vehicle_id(self, row):
+        if row in self.custom_ids:
+            return self.custom_ids[row]
+        return str(uuid.UUID(int=(self.id_hi[row] << 64) | self.id_lo[row]))
+
+    def set_vehicle_id(self, row, value):
+        self._ensure_writable()
+        try:
+            number = uuid.UUID(value).int
+            canonical = str(uuid.UUID(int=number)) == value
+        except (ValueError, TypeError, AttributeError):
+            canonical = False
+
+        if canonical:
+            self.id_hi[row] = number >> 64
+            self.id_lo[row] = number & _MASK64
+            self.custom_ids.pop(row, None)
+        else:
+            self.id_hi[row] = 0
+            self.id_lo[row] = 0
+            self.custom_ids[row] = value
+
+    def row_for(self, vehicle):
+        # Номер строки представления этого хранилища
+        if getattr(vehicle, "_store", None) is not self:
+            raise ValueError("Транспорт не принадлежит хранилищу")
+        return self.row_of(vehicle)
+
+    def get_clients_list(self, row):
+        # Список строится из таблицы распределения при каждом обращении
+        return self.allocation.parts_for_vehicle(row)
+
+    def set_clients_list(self, row, value):
+        # Сначала запоминаем строки клиентов: value может ссылаться на эту же таблицу
+        entries = [(self.allocation.client_row_for(c), c.cargo_weight) for c in value]
+        self.allocation.remove_vehicle(row)
+        for client_row, weight in entries:
+            self.allocation.add(row, client_row, weight)
+
+    def load(self, row, client):
+        self.loads[row] += client.cargo_weight
+        self.allocation.add_client(row, client)
+        self._notify("load", row)
+
+    def reset_loads(self):
+        self.loads[:] = array("d", bytes(8 * len(self)))
+        self.allocation.clear()
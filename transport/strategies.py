@@ -0,0 +1,116 @@
+from array import array
+from bisect import bisect_left, insort
+
+
+class MaxSegmentTree:
+    # Дерево отрезков по свободному месту транспорта (в порядке убывания
+    # вместимости). Поиск первого транспорта, куда помещается груз, — O(log V).
+    def __init__(self, values):
+        size = 1
+        while size < max(len(values), 1):
+            size *= 2
+        self.size = size
+        self.tree = array("d", [float("-inf")]) * (2 * size)
+        for i, value in enumerate(values):
+            self.tree[size + i] = value
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def update(self, pos: int, value: float):
+        i = self.size + pos
+        self.tree[i] = value
+        i //= 2
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i //= 2
+
+    def find_first(self, need: float):
+        # Самая левая позиция со значением >= need или None
+        if self.tree[1] < need:
+            return None
+        i = 1
+        while i < self.size:
+            i *= 2
+            if self.tree[i] < need:
+                i += 1
+        return i - self.size
+
+
+def _sorted_rows(clients, vehicles):
+    # Тот же порядок, что и у распределения с делением: VIP первыми,
+    # затем по убыванию веса; транспорт — по убыванию вместимости
+    vip, weights = clients.vip, clients.weights
+    client_order = sorted(range(len(clients)), key=lambda r: (not vip[r], -weights[r]))
+    capacities = vehicles.capacities
+    vehicle_order = sorted(range(len(vehicles)), key=lambda r: -capacities[r])
+    return client_order, vehicle_order
+
+
+def _place(clients, vehicles, client_row, vehicle_row):
+    weight = clients.weights[client_row]
+    vehicles.allocation.add(vehicle_row, client_row, weight)
+    vehicles.loads[vehicle_row] += weight
+
+
+def first_fit_decreasing(clients, vehicles):
+    # Груз целиком в первый по порядку транспорт, где хватает места
+    client_order, vehicle_order = _sorted_rows(clients, vehicles)
+    capacities, loads = vehicles.capacities, vehicles.loads
+    tree = MaxSegmentTree([capacities[r] - loads[r] for r in vehicle_order])
+
+    for row in client_order:
+        weight = clients.weights[row]
+        if weight <= 0:
+            continue
+        pos = tree.find_first(weight)
+        if pos is None:
+            continue
+        v_row = vehicle_order[pos]
+        _place(clients, vehicles, row, v_row)
+        tree.update(pos, capacities[v_row] - loads[v_row])
+
+    return vehicle_order
+
+
+def best_fit_decreasing(clients, vehicles):
+    # Груз целиком в транспорт с наименьшим подходящим свободным местом;
+    # свободное место держим в отсортированном списке (свободно, позиция)
+    client_order, vehicle_order = _sorted_rows(clients, vehicles)
+    capacities, loads = vehicles.capacities, vehicles.loads
+    free = sorted(
+        (capacities[r] - loads[r], pos)
+        for pos, r in enumerate(vehicle_order)
+        if capacities[r] - loads[r] > 0
+    )
+
+    for row in client_order:
+        weight = clients.weights[row]
+        if weight <= 0:
+            continue
+        i = bisect_left(free, (weight, -1))
+        if i == len(free):
+            continue
+        _, pos = free.pop(i)
+        v_row = vehicle_order[pos]
+        _place(clients, vehicles, row, v_row)
+        left = capacities[v_row] - loads[v_row]
+        if left > 0:
+            insort(free, (left, pos))
+
+    return vehicle_order
+
+
+# Стратегии упаковки без деления груза: имя -> функция(clients, vehicles),
+# которая заполняет таблицу распределения и возвращает номера строк
+# транспорта в порядке вывода. Распределение с делением ("split")
+# встроено в TransportCompany.
+STRATEGIES = {
+    "first_fit": first_fit_decreasing,
+    "best_fit": best_fit_decreasing,
+}
+
+
+def register_strategy(name: str, func):
+    if name == "split":
+        raise ValueError("Имя 'split' зарезервировано за распределением с делением груза")
+    STRATEGIES[name] = func
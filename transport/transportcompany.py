@@ -1,13 +1,112 @@
+import hashlib
+from array import array
+
 from transport.client import Client
 from transport.vehicle import Vehicle
+from transport.allocation import AllocationTable
+from transport.cache import ResultCache, StoreFingerprint, client_row_hashes, vehicle_row_hashes
+from transport.greedy import GreedyPlan
+from transport.name_index import NameIndex
+from transport.registry import Registry
+from transport.result import DistributionResult
+from transport.sorting import SortIndex
+from transport.stats import Stats
+from transport.store import ClientStore, VehicleStore, VEHICLE_KINDS
+from transport.strategies import STRATEGIES
+from transport.vectorized import prefix_sum_allocation
+
+
+def _copied(store, items):
+    # Представления строк самого хранилища (например, company.clients =
+    # sorted(company.clients, ...)) переживут его очистку только копиями
+    return [store._detached(store.row_of(obj)) if getattr(obj, "_store", None) is store else obj
+            for obj in items]
+
+
+class DistributionCancelled(Exception):
+    # Распределение прервано из обратного вызова progress
+    pass
 
 
 class TransportCompany:
-    def __init__(self, name: str):
+    def __init__(self, name: str, incremental: bool = False, stats: bool = False,
+                 cache_entries: int = 8, cache_bytes: int = 64 * 2**20):
         self.name = name
-        self.vehicles = []
-        self.clients = []
 
+        # Статистика по фазам и счётчики; включается stats=True или stats.enabled
+        self.stats = Stats(enabled=stats)
+
+        # В инкрементальном режиме после распределения компания хранит план
+        # жадного алгоритма и при каждом изменении клиента или транспорта
+        # чинит только затронутую часть распределения
+        self.incremental = incremental
+        self._plan = None
+
+        self._clients = ClientStore()
+        self._vehicles = VehicleStore(AllocationTable(self._clients))
+
+        self._clients.listeners.append(self._on_clients_changed)
+        self._vehicles.listeners.append(self._on_vehicles_changed)
+
+        # Поиск клиентов по подстроке имени
+        self.name_index = NameIndex(self._clients)
+
+        # Сортировка таблиц по полям без создания объектов
+        clients, vehicles = self._clients, self._vehicles
+        self.client_sort = SortIndex(clients, {
+            "name": lambda row: clients.names[row],
+            "cargo_weight": lambda row: clients.weights[row],
+            "is_vip": lambda row: not clients.vip[row],
+        })
+        self.vehicle_sort = SortIndex(vehicles, {
+            "vehicle_id": vehicles.get_vehicle_id,
+            "type": lambda row: VEHICLE_KINDS[vehicles.kinds[row]].__name__,
+            "capacity": lambda row: vehicles.capacities[row],
+            "current_load": lambda row: vehicles.loads[row],
+            "clients_count": lambda row: len(vehicles.allocation.positions_for_vehicle(row)),
+        }, derived=("current_load", "clients_count"))
+
+        # Отпечаток содержимого обновляется по событиям хранилищ; результаты
+        # распределения кешируются по (отпечаток, движок, стратегия).
+        # cache_entries=0 отключает кеш
+        self._client_print = StoreFingerprint(clients, client_row_hashes(clients))
+        self._vehicle_print = StoreFingerprint(vehicles, vehicle_row_hashes(vehicles))
+        self.result_cache = ResultCache(cache_entries, cache_bytes)
+
+        # Доступ к записям по стабильному ID строки (clients.ids, vehicles.ids)
+        # и к транспорту по vehicle_id; номера строк сдвигаются при удалении,
+        # ID — нет
+        self.client_registry = Registry(clients)
+        self.vehicle_registry = Registry(vehicles, key=vehicles.get_vehicle_id)
+
+    # vehicles и clients — колоночные хранилища; присваивание списка
+    # (например, при загрузке состояния) перезаполняет хранилище
+    @property
+    def vehicles(self):
+        return self._vehicles
+
+    @vehicles.setter
+    def vehicles(self, items):
+        items = _copied(self._vehicles, items)
+        self._vehicles.clear()
+        for vehicle in items:
+            self.add_vehicle(vehicle)
+
+    @property
+    def clients(self):
+        return self._clients
+
+    @clients.setter
+    def clients(self, items):
+        items = _copied(self._clients, items)
+        self._clients.clear()
+        for client in items:
+            self.add_client(client)
+
+    @property
+    def allocation(self):
+        # Результат последнего распределения: строки (транспорт, клиент, вес)
+        return self._vehicles.allocation
 
     def add_vehicle(self, vehicle):
         if not isinstance(vehicle, Vehicle):
@@ -15,61 +114,211 @@ class TransportCompany:
         self.vehicles.append(vehicle)
 
     def list_vehicles(self):
-        return self.vehicles
+        return list(self.vehicles)
+
+    def get_vehicle(self, vehicle_id: str):
+        registry = self.vehicle_registry
+        return registry.get(registry.find(vehicle_id))
+
+    def update_vehicle(self, vehicle_id: str, vehicle):
+        # Транспорт заменяется на месте, vehicle_id сохраняется
+        if not isinstance(vehicle, Vehicle):
+            raise TypeError("vehicle должен быть экземпляром Vehicle или его наследника")
+        registry = self.vehicle_registry
+        row_id = registry.find(vehicle_id)
+        vehicle.vehicle_id = vehicle_id
+        registry.update(row_id, vehicle)
+
+    def remove_vehicle(self, vehicle_id: str):
+        registry = self.vehicle_registry
+        return registry.delete(registry.find(vehicle_id))
 
     def add_client(self, client):
         if not isinstance(client, Client):
             raise TypeError("client должен быть экземпляром Client")
         self.clients.append(client)
 
+    def get_client(self, client_id: int):
+        return self.client_registry.get(client_id)
+
+    def update_client(self, client_id: int, client):
+        if not isinstance(client, Client):
+            raise TypeError("client должен быть экземпляром Client")
+        self.client_registry.update(client_id, client)
+
+    def remove_client(self, client_id: int):
+        return self.client_registry.delete(client_id)
+
+    @property
+    def fingerprint(self):
+        # Отпечаток клиентов и транспорта (по содержимому и порядку строк)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self._client_print.digest())
+        digest.update(self._vehicle_print.digest())
+        return digest.hexdigest()
+
+    def find_clients(self, query: str):
+        # Номера строк клиентов, чьё имя содержит query без учёта регистра
+        return self.name_index.search(query)
+
     def _reset_vehicle_loads(self):
-        for v in self.vehicles:
-            v.current_load = 0
-            v.clients_list = []
+        self.vehicles.reset_loads()
 
-    def optimize_cargo_distribution(self):
-        if not self.vehicles:
-            print(" Нет транспорта для распределения.")
+    def _on_clients_changed(self, event, row):
+        if self._plan is not None and self._plan.on_client_event(event, row):
             return
+        self._invalidate_distribution(event)
 
-        if not self.clients:
-            print(" Нет клиентов для распределения.")
+    def _on_vehicles_changed(self, event, row):
+        if self._plan is not None and self._plan.on_vehicle_event(event, row):
             return
+        self._invalidate_distribution(event)
 
+    def _invalidate_distribution(self, event):
+        # Удаление или изменение строки сдвигает/меняет строки,
+        # на которые ссылается таблица распределения
+        self._plan = None
+        if event in ("update", "delete", "clear"):
+            self._reset_vehicle_loads()
+
+    def optimize_cargo_distribution(self, engine: str = "python", strategy: str = "split",
+                                    progress=None):
+        # strategy="split" — груз клиента делится между транспортом:
+        #   engine="python" — жадный алгоритм на списках,
+        #   engine="numpy" — то же распределение через накопленные суммы (нужен numpy);
+        # strategy="first_fit"/"best_fit" и зарегистрированные в STRATEGIES —
+        #   упаковка без деления груза.
+        # progress(done, total) сообщает число распределённых клиентов; если он
+        # бросит DistributionCancelled, частичный результат сбрасывается
+        if engine not in ("python", "numpy"):
+            raise ValueError(f"Неизвестный движок распределения: {engine}")
+        if strategy != "split" and strategy not in STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия распределения: {strategy}")
+        if strategy != "split" and engine != "python":
+            raise ValueError("engine='numpy' поддерживается только для strategy='split'")
+
+        if not self.vehicles:
+            return DistributionResult(self, message="Нет транспорта для распределения.")
+
+        if not self.clients:
+            return DistributionResult(self, message="Нет клиентов для распределения.")
+
+        # Распределение актуально: в инкрементальном режиме оно уже починено
+        if strategy == "split" and engine == "python" and self._plan is not None:
+            return self._plan_result(self._plan)
+
+        self._plan = None
         self._reset_vehicle_loads()
 
-        sorted_clients = sorted(
-            self.clients,
-            key=lambda c: (not c.is_vip, -c.cargo_weight)
-        )
+        # В инкрементальном режиме распределение с делением должно оставить
+        # план для починки, а из записи кеша его не восстановить; повторные
+        # вызовы без правок и так отвечает план
+        cache = self.result_cache
+        builds_plan = self.incremental and strategy == "split" and engine == "python"
+        key = (self.fingerprint, engine, strategy) if cache.max_entries > 0 and not builds_plan else None
+        entry = cache.get(key) if key is not None else None
+        if entry is not None:
+            self.stats.count("cache_hits")
+            return self._restore_result(entry)
 
-        sorted_vehicles = sorted(self.vehicles, key=lambda v: -v.capacity)
+        try:
+            result = self._distribute(engine, strategy, progress)
+        except DistributionCancelled:
+            self._plan = None
+            self._reset_vehicle_loads()
+            raise
+        if key is not None:
+            self.stats.count("cache_misses")
+            cache.put(key, self._cache_entry(result))
+        return result
 
-        for client in sorted_clients:
-            remaining = client.cargo_weight  
+    def _cache_entry(self, result):
+        table = self.allocation
+        order = array("q", [self.vehicles.row_for(v) for v in result.vehicles])
+        return {
+            "vehicle_rows": table.vehicle_rows.tobytes(),
+            "client_rows": table.client_rows.tobytes(),
+            "weights": table.weights.tobytes(),
+            "loads": self.vehicles.loads.tobytes(),
+            "order": order.tobytes(),
+            "short_rows": result.short_rows.tobytes(),
+            "short_amounts": result.short_amounts.tobytes(),
+        }
 
-            for vehicle in sorted_vehicles:
-                if remaining <= 0:
-                    break
+    def _restore_result(self, entry):
+        # Строки в записи кеша совпадают с текущими: отпечаток учитывает порядок
+        self.allocation.extend_from_bytes(
+            entry["vehicle_rows"], entry["client_rows"], entry["weights"])
+        self.vehicles.loads[:] = array("d", entry["loads"])
+        order = array("q", entry["order"])
+        return DistributionResult(
+            self, [self.vehicles[row] for row in order],
+            array("q", entry["short_rows"]), array("d", entry["short_amounts"]),
+        )
 
-                free_space = vehicle.capacity - vehicle.current_load
-                if free_space <= 0:
-                    continue
+    def _plan_result(self, plan):
+        with self.stats.phase("views"):
+            vehicles = plan.sorted_vehicles()
+        short_rows, short_amounts = plan.shortfalls()
+        return DistributionResult(self, vehicles, short_rows, short_amounts)
 
+    def _distribute(self, engine, strategy, progress):
+        stats = self.stats
+        if strategy == "split" and engine == "python":
+            with stats.phase("sort"):
+                plan = GreedyPlan(self.clients, self.vehicles, stats)
+            plan.run(progress=progress)
+            if self.incremental:
+                self._plan = plan
+            return self._plan_result(plan)
 
-                to_load = min(remaining, free_space)
+        # Остальные пути считаются одним шагом: ход сообщается в начале и в конце
+        total = len(self.clients)
+        if progress is not None:
+            progress(0, total)
+        if strategy != "split":
+            with stats.phase("fill"):
+                vehicle_order = STRATEGIES[strategy](self.clients, self.vehicles)
+            with stats.phase("views"):
+                vehicles = [self.vehicles[row] for row in vehicle_order]
+            result = DistributionResult(self, vehicles, *self._unplaced())
+        else:
+            result = self._distribute_numpy()
+        stats.count("parts", len(self.allocation))
+        stats.count("unallocated_clients", result.unallocated_clients)
+        if progress is not None:
+            progress(total, total)
+        return result
 
+    def _unplaced(self):
+        # Стратегии без деления кладут груз целиком или не кладут вовсе:
+        # недогружены клиенты с весом, которых нет в таблице распределения
+        clients = self.clients
+        weights, vip = clients.weights, clients.vip
+        placed = set(self.allocation.client_rows)
+        rows = [row for row in range(len(clients)) if weights[row] > 0 and row not in placed]
+        rows.sort(key=lambda r: (not vip[r], -weights[r]))
+        return array("q", rows), array("d", [weights[row] for row in rows])
 
-                part_client = Client(
-                    name=f"{client.name}",
-                    cargo_weight=to_load,
-                    is_vip=client.is_vip
-                )
+    def _distribute_numpy(self):
+        clients = self.clients
+        stats = self.stats
 
-                vehicle.load_cargo(part_client)
-                remaining -= to_load
+        # Колонки хранилищ передаются в numpy без промежуточных списков
+        with stats.phase("fill"):
+            alloc = prefix_sum_allocation(clients.weights, self.vehicles.capacities, clients.vip)
 
-            if remaining > 0:
-                print(f" Клиент {client.name}: не удалось распределить {remaining} т.")
+            self.allocation.extend_from_bytes(
+                alloc["vehicle_rows"].tobytes(),
+                alloc["client_rows"].tobytes(),
+                alloc["amounts"].tobytes(),
+            )
+            self.vehicles.loads[:] = array("d", alloc["loads"].tobytes())
 
-        return sorted_vehicles
+        with stats.phase("views"):
+            vehicles = [self.vehicles[i] for i in alloc["vehicle_order"].tolist()]
+        return DistributionResult(
+            self, vehicles,
+            array("q", alloc["short_rows"].tolist()),
+            array("d", alloc["short_amounts"].tolist()),
+        )
@@ -0,0 +1,91 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy не обязателен, без него доступен только engine="python"
+    np = None
+
+# Границы накопленных сумм спроса и вместимости, которые разошлись меньше
+# чем на эту долю общего объёма, считаются совпадающими: иначе ошибка
+# округления cumsum даёт между ними части груза в 1e-16 т
+SNAP_RTOL = 1e-12
+
+
+def numpy_available():
+    return np is not None
+
+
+def shifted_rows(rows, removed_row: int):
+    # Номера строк (array("q")) после удалённой строки уменьшаются на 1.
+    # С numpy — одним проходом по буферу, без него — циклом Python
+    if np is None:
+        return array("q", (r - (r > removed_row) for r in rows))
+    values = np.frombuffer(rows, dtype=np.int64)
+    return array("q", (values - (values > removed_row)).tobytes())
+
+
+def prefix_sum_allocation(weights, capacities, is_vip):
+    # Жадное распределение с делением груза — это слияние двух накопленных сумм:
+    # спроса клиентов (VIP первыми, затем по убыванию веса) и вместимости
+    # транспорта (по убыванию). Каждый отрезок между соседними границами
+    # двух сумм — это одна часть груза "транспорт <- клиент".
+    if np is None:
+        raise RuntimeError("Для engine='numpy' требуется пакет numpy")
+
+    weights = np.maximum(np.asarray(weights, dtype=np.float64), 0.0)
+    capacities = np.maximum(np.asarray(capacities, dtype=np.float64), 0.0)
+    is_vip = np.asarray(is_vip, dtype=bool)
+
+    # lexsort устойчив, поэтому порядок совпадает с sorted(...) в Python
+    client_order = np.lexsort((-weights, ~is_vip))
+    vehicle_order = np.argsort(-capacities, kind="stable")
+
+    demand = np.cumsum(weights[client_order])
+    supply = np.cumsum(capacities[vehicle_order])
+
+    if demand.size and supply.size:
+        # Каждую границу вместимости прижимаем к ближайшей границе спроса
+        tol = SNAP_RTOL * max(demand[-1], supply[-1], 1.0)
+        right = np.minimum(np.searchsorted(demand, supply), demand.size - 1)
+        left = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(demand[left] - supply) <= np.abs(demand[right] - supply),
+                           demand[left], demand[right])
+        supply = np.where(np.abs(nearest - supply) <= tol, nearest, supply)
+
+    total_demand = demand[-1] if demand.size else 0.0
+    total_supply = supply[-1] if supply.size else 0.0
+    limit = min(total_demand, total_supply)
+
+    points = np.unique(np.concatenate(([0.0], demand, supply)))
+    points = points[points <= limit]
+    starts = points[:-1]
+    amounts = np.diff(points)
+
+    client_pos = np.searchsorted(demand, starts, side="right")
+    vehicle_pos = np.searchsorted(supply, starts, side="right")
+
+    # Нераспределённый остаток есть только у клиентов, чей спрос вышел за limit
+    previous = np.concatenate(([0.0], demand[:-1]))
+    unallocated = np.clip(demand - np.maximum(previous, limit), 0.0, None)
+    short = np.flatnonzero(unallocated > 0)
+
+    # Номера строк хранилищ и итоговая загрузка транспорта
+    vehicle_rows = vehicle_order[vehicle_pos].astype(np.int64)
+    client_rows = client_order[client_pos].astype(np.int64)
+    loads = np.bincount(vehicle_rows, weights=amounts, minlength=capacities.size)
+    # накопленные суммы могут разойтись с вместимостью на ошибку округления
+    loads = np.minimum(loads, capacities)
+
+    return {
+        "client_order": client_order,
+        "vehicle_order": vehicle_order,
+        "client_pos": client_pos,
+        "vehicle_pos": vehicle_pos,
+        "vehicle_rows": vehicle_rows,
+        "client_rows": client_rows,
+        "amounts": amounts,
+        "loads": loads.astype(np.float64),
+        "unallocated": unallocated,
+        "short_rows": client_order[short],
+        "short_amounts": unallocated[short],
+    }
@@ -1,15 +1,53 @@
 import uuid
 from .client import Client
+from .columns import column_property
 
 class Vehicle:
+    # Транспорт — лёгкое представление строки VehicleStore.
+    # До добавления в компанию значения хранятся в самом объекте.
+    __slots__ = ("_store", "_row", "_id", "_vehicle_id", "_capacity", "_current_load", "_clients_list")
+
     def __init__(self, capacity: float):
+        self._store = None
+        self._row = -1
+        self._id = -1
+
         # Генерируем уникальный ID транспорта
-        self.vehicle_id = str(uuid.uuid4())
+        self._vehicle_id = str(uuid.uuid4())
         
         # Атрибуты
-        self.capacity = capacity
-        self.current_load = 0.0
-        self.clients_list = []
+        self._capacity = capacity
+        self._current_load = 0.0
+        self._clients_list = []
+
+    capacity = column_property("capacity", "capacities")
+    current_load = column_property("current_load", "loads")
+
+    @property
+    def vehicle_id(self):
+        if self._store is None:
+            return self._vehicle_id
+        return self._store.get_vehicle_id(self._store.row_of(self))
+
+    @vehicle_id.setter
+    def vehicle_id(self, value):
+        if self._store is None:
+            self._vehicle_id = value
+        else:
+            self._store.set_value("vehicle_id", self._store.row_of(self), value)
+
+    @property
+    def clients_list(self):
+        if self._store is None:
+            return self._clients_list
+        return self._store.get_clients_list(self._store.row_of(self))
+
+    @clients_list.setter
+    def clients_list(self, value):
+        if self._store is None:
+            self._clients_list = value
+        else:
+            self._store.set_clients_list(self._store.row_of(self), value)
 
     def load_cargo(self, client):
         # Валидация типа
@@ -21,8 +59,12 @@ class Vehicle:
             raise ValueError("Невозможно загрузить: превышение грузоподъёмности транспортного средства.")
 
         # Загрузка
-        self.current_load += client.cargo_weight
-        self.clients_list.append(client)
+        if self._store is None:
+            self.current_load += client.cargo_weight
+            self.clients_list.append(client)
+        else:
+            # у транспорта компании грузы записываются в таблицу распределения
+            self._store.load(self._store.row_of(self), client)
 
     def __str__(self):
         return (f"Vehicle ID: {self.vehicle_id}\n"
@@ -30,9 +72,13 @@ class Vehicle:
                 f"Current load: {self.current_load} t")
     
 class Truck(Vehicle):
+    __slots__ = ("_color",)
+
     def __init__(self, capacity: float, color: str):
         super().__init__(capacity)
-        self.color = color
+        self._color = color
+
+    color = column_property("color", "colors")
 
     def __str__(self):
         return (f"Truck ({self.color}) | ID: {self.vehicle_id} | "
@@ -41,10 +87,14 @@ class Truck(Vehicle):
 
 
 class Train(Vehicle):
+    __slots__ = ("_number_of_cars",)
+
     def __init__(self, capacity: float, number_of_cars: int):
         super().__init__(capacity)
-        self.number_of_cars = number_of_cars
+        self._number_of_cars = number_of_cars
+
+    number_of_cars = column_property("number_of_cars", "cars")
 
     def __str__(self):
         return (f"Train ({self.number_of_cars} cars) | ID: {self.vehicle_id} | "
-                f"Capacity: {self.capacity}t | Load: {self.current_load}t")
\ No newline at end of file
+                f"Capacity: {self.capacity}t | Load: {self.current_load}t")